@@ -0,0 +1,87 @@
+import logging
+import re
+import time
+
+import discord
+
+from ledger import BAN, JAIL, FC
+
+log = logging.getLogger(__name__)
+
+# Imports the ban, jail and faction-cooldown logs that were posted before the
+# ledger existed. The log channels are read oldest first, each message is
+# matched against the template banlog/jaillog/fclog produce, and the entries
+# are written in large transactions together with a checkpoint, so an
+# interrupted import picks up after the last message it saved.
+
+BAN_PATTERN = re.compile(
+    r"PLAYER NAME:\s*(?P<player>[^`\n]*?)\s*`.*?"
+    r"BAN DAYS:\s*(?P<duration>[^\n]*?)\s*\n.*?"
+    r"UNBAN:\s*(?P<until>[^\n]*?)\s*\n.*?"
+    r"BANNED BY:\s*(?P<moderator>[^\n]*?)\s*(?:\*\*)?\s*\n.*?"
+    r"REASON:\s*(?P<reason>.*?)\s*(?:\*\*|$)",
+    re.S
+)
+JAIL_PATTERN = re.compile(
+    r"PLAYER NAME:\s*(?P<player>[^\n]*?)\s*\n.*?"
+    r"DISCORD:`?\s*(?P<user>[^\n]*?)\s*\n.*?"
+    r"Prisoned For\s*(?P<duration>[^\n]*?)\s*Min's by\s*(?P<moderator>[^\n]*?)\s*\n.*?"
+    r"Reason:\s*(?P<reason>.*?)\s*$",
+    re.S
+)
+FC_PATTERN = re.compile(
+    r"In-Game Name:\s*(?P<player>[^`\n]*?)\s*`.*?"
+    r"Reason:\s*`\s*(?P<reason>[^`]*?)\s*`.*?"
+    r"Cooldown End:\s*`\s*(?P<until>[^`]*?)\s*`.*?"
+    r"Player Mention\s*(?P<user>\S*)",
+    re.S
+)
+PATTERNS = {BAN: BAN_PATTERN, JAIL: JAIL_PATTERN, FC: FC_PATTERN}
+MENTION_PATTERN = re.compile(r"<@!?(\d+)>")
+
+
+def _mention_id(text):
+    match = MENTION_PATTERN.search(text or "")
+    return int(match.group(1)) if match else None
+
+
+def parse_log(kind, message: discord.Message):
+    # -> ledger row (ledger.COLUMNS order) or None if the message isn't a log in this channel's format
+    match = PATTERNS[kind].search(message.content)
+    if not match:
+        return None
+    fields = match.groupdict()
+    moderator_id = _mention_id(fields.get("moderator"))
+    moderator = ""
+    if moderator_id and message.guild:
+        member = message.guild.get_member(moderator_id)
+        moderator = member.name if member else ""
+    return (
+        kind, fields["player"], _mention_id(fields.get("user")), moderator_id, moderator,
+        fields.get("duration", ""), fields.get("until", ""), fields["reason"],
+        message.channel.id, message.id, message.created_at.timestamp()
+    )
+
+
+async def backfill_channel(ledger, channel, kind, batch_size=1000):
+    # -> (messages read, entries added, seconds taken)
+    after = await ledger.checkpoint(channel.id)
+    started = time.perf_counter()
+    scanned = added = 0
+    rows = []
+    last_id = None
+    async for message in channel.history(limit=None, after=discord.Object(id=after) if after else None, oldest_first=True):
+        scanned += 1
+        last_id = message.id
+        row = parse_log(kind, message)
+        if row:
+            rows.append(row)
+        if scanned % batch_size == 0:
+            added += await ledger.record_many(rows, (channel.id, last_id))
+            rows = []
+            elapsed = time.perf_counter() - started
+            log.info("Backfill of #%s: %d messages, %d entries (%.0f msg/s)", channel.name, scanned, added,
+                     scanned / elapsed, extra={"channel_id": channel.id})
+    if last_id is not None:
+        added += await ledger.record_many(rows, (channel.id, last_id))
+    return scanned, added, time.perf_counter() - started
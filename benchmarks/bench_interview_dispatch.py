@@ -0,0 +1,89 @@
+# Per-message cost of routing DMs to interview sessions: the old per-applicant
+# wait_for("message", check=...) listeners vs. the InterviewEngine dict dispatch.
+# Run from the repo root: python benchmarks/bench_interview_dispatch.py
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from interviews import SessionStore, InterviewEngine
+
+ACTIVE = [10, 100, 1_000, 10_000]
+MESSAGES = 20_000
+
+
+class DMChannel:
+    pass
+
+
+class Message:
+    __slots__ = ("author", "channel", "content")
+
+    def __init__(self, author, channel, content):
+        self.author = author
+        self.channel = channel
+        self.content = content
+
+
+class User:
+    __slots__ = ("id",)
+
+    def __init__(self, user_id):
+        self.id = user_id
+
+    def __eq__(self, other):
+        return isinstance(other, User) and other.id == self.id
+
+    __hash__ = object.__hash__
+
+
+def wait_for_listeners(users):
+    # What discord.py does for pending wait_for calls: every message runs every check
+    listeners = []
+    for user in users:
+        def check(m, user=user):
+            return m.author == user and isinstance(m.channel, DMChannel)
+        listeners.append(check)
+
+    def dispatch(message):
+        for check in listeners:
+            check(message)
+    return dispatch
+
+
+def engine_dispatch(users):
+    store = SessionStore(os.path.join(tempfile.mkdtemp(), "bench.db"))
+    engine = InterviewEngine(store, question_count=10**9, dropdown_questions={})
+    for user in users:
+        engine.start(user.id)
+
+    def dispatch(message):
+        if isinstance(message.channel, DMChannel) and message.author.id in engine:
+            engine.on_text(message.author.id, message.content)
+    return dispatch
+
+
+def bench(dispatch, messages):
+    start = time.perf_counter()
+    for m in messages:
+        dispatch(m)
+    return (time.perf_counter() - start) / len(messages) * 1e6
+
+
+def main():
+    channel = DMChannel()
+    print(f"{'active':>7}  {'wait_for µs/msg':>16}  {'engine µs/msg':>14}")
+    for active in ACTIVE:
+        users = [User(i) for i in range(active)]
+        # Mix of applicant answers and unrelated traffic
+        messages = [Message(users[i % active] if i % 2 else User(10**9 + i), channel, "answer")
+                    for i in range(MESSAGES)]
+        old = bench(wait_for_listeners(users), messages)
+        new = bench(engine_dispatch(users), messages)
+        print(f"{active:>7}  {old:>16.2f}  {new:>14.2f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# /history lookup latency against a large moderation ledger.
+# Run from the repo root: python benchmarks/bench_ledger.py
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ledger import Ledger, BAN, JAIL, FC
+
+ENTRIES = 300_000
+PLAYERS = 40_000
+QUERIES = 1_000
+BATCH = 10_000
+FIRST = "john mike ravi arjun dev sam alex rahul vikram leo max karan nick tony ajay".split()
+LAST = "doe smith kumar singh sharma khan reddy patel das nair iyer gill bose rao shah".split()
+REASONS = ["RDM", "VDM", "fail RP", "combat logging", "meta gaming", "power gaming", "NLR", "cop baiting"]
+
+
+async def main():
+    rng = random.Random(1234)
+    players = [f"{rng.choice(FIRST).title()}_{rng.choice(LAST).title()}{rng.randint(1, 99)}" for _ in range(PLAYERS)]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        ledger = Ledger(os.path.join(tmp, "ledger.db"))
+        start = time.perf_counter()
+        now = time.time()
+        for offset in range(0, ENTRIES, BATCH):
+            rows = [
+                (rng.choice((BAN, JAIL, FC)), rng.choice(players), None, 1, "mod", "3 days", "", rng.choice(REASONS),
+                 1, i + 1, now - i * 60)
+                for i in range(offset, offset + BATCH)
+            ]
+            await ledger.record_many(rows)
+        print(f"inserted {ENTRIES} entries in {time.perf_counter() - start:.1f}s")
+
+        for label, names in (
+            ("exact name", [rng.choice(players) for _ in range(QUERIES)]),
+            ("first name", [rng.choice(FIRST) for _ in range(QUERIES)]),
+        ):
+            timings = []
+            for name in names:
+                start = time.perf_counter()
+                await ledger.history(name)
+                timings.append((time.perf_counter() - start) * 1000)
+            timings.sort()
+            print(f"{label:>10}: mean {sum(timings) / len(timings):.2f} ms, p99 {timings[int(len(timings) * 0.99)]:.2f} ms")
+        ledger.db.close()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
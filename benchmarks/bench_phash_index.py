@@ -0,0 +1,50 @@
+# Lookup latency of the perceptual-hash index as it grows.
+# Run from the repo root: python benchmarks/bench_phash_index.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from phash_index import HammingIndex
+
+SIZES = [1_000, 10_000, 50_000, 100_000, 200_000]
+QUERIES = 2_000
+
+
+def flip_bits(h, n, rng):
+    for bit in rng.sample(range(64), n):
+        h ^= 1 << bit
+    return h
+
+
+def main():
+    rng = random.Random(1234)
+    index = HammingIndex(max_distance=8)
+    stored = []
+    print(f"{'proofs':>8}  {'mean ms':>8}  {'p99 ms':>8}  {'hits':>5}")
+    for size in SIZES:
+        while len(stored) < size:
+            h = rng.getrandbits(64)
+            stored.append(h)
+            index.add(h, len(stored))
+
+        # Half the queries are near-duplicates of stored proofs, half are new images
+        queries = [flip_bits(rng.choice(stored), rng.randint(0, 8), rng) if i % 2 else rng.getrandbits(64)
+                   for i in range(QUERIES)]
+        timings = []
+        hits = 0
+        for q in queries:
+            start = time.perf_counter()
+            if index.search(q):
+                hits += 1
+            timings.append((time.perf_counter() - start) * 1000)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p99 = timings[int(len(timings) * 0.99)]
+        print(f"{size:>8}  {mean:>8.3f}  {p99:>8.3f}  {hits:>5}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,57 @@
+# Per-message cost of SpamGuard.check on a replayed message stream: mostly
+# normal chatter across many users, with a few flooders and copy-pasters mixed in.
+# Run from the repo root: python benchmarks/bench_spam_guard.py
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from spam_guard import SpamGuard
+
+USERS = [100, 1_000, 10_000, 50_000]
+MESSAGES = 200_000
+BUDGET_US = 50
+WORDS = "bro server join wl when rp cop ems mech gang heist bank car ok lol pls admin ticket".split()
+
+
+def replay_stream(users, rng):
+    # (user id, content, timestamp) at ~40 messages/second overall
+    spammers = set(rng.sample(range(users), max(1, users // 200)))
+    stream = []
+    now = 0.0
+    for _ in range(MESSAGES):
+        now += rng.expovariate(40)
+        user = rng.randrange(users)
+        if user in spammers and rng.random() < 0.5:
+            for _ in range(rng.randint(3, 8)):
+                stream.append((user, "JOIN MY SERVER discord.gg/xyz", now))
+                now += 0.05
+            continue
+        stream.append((user, " ".join(rng.choices(WORDS, k=rng.randint(1, 12))), now))
+    return stream[:MESSAGES]
+
+
+def main():
+    rng = random.Random(1234)
+    print(f"{'users':>7}  {'mean us':>8}  {'p99 us':>8}  {'flagged':>7}  {'tracked':>7}")
+    for users in USERS:
+        stream = replay_stream(users, rng)
+        guard = SpamGuard(max_users=10_000)
+        check = guard.check
+        timings = []
+        for user, content, now in stream:
+            start = time.perf_counter()
+            check(user, content, now)
+            timings.append((time.perf_counter() - start) * 1e6)
+        timings.sort()
+        mean = sum(timings) / len(timings)
+        p99 = timings[int(len(timings) * 0.99)]
+        flagged = guard.stats["flood"] + guard.stats["duplicate"]
+        print(f"{users:>7}  {mean:>8.2f}  {p99:>8.2f}  {flagged:>7}  {len(guard):>7}")
+    print(f"budget: {BUDGET_US} us/message")
+
+
+if __name__ == "__main__":
+    main()
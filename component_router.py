@@ -0,0 +1,53 @@
+import re
+
+import discord
+
+# Restart-safe buttons/selects. Everything a handler needs is encoded in the
+# component's custom_id ("prefix:arg:arg"), handlers are registered once by
+# prefix, and clicks are dispatched from on_interaction. Nothing is kept in
+# memory per message, so old messages keep working after a restart.
+
+CUSTOM_ID_PATTERN = re.compile(r"([A-Za-z]+)[:_](.*)", re.S)
+
+
+def custom_id(prefix, *args):
+    return ":".join([prefix, *map(str, args)])
+
+
+def routed_view(*items):
+    # The View is only used to serialise the components. Stopping it up front
+    # means discord.py never stores it; clicks go through the router instead.
+    view = discord.ui.View(timeout=None)
+    for item in items:
+        view.add_item(item)
+    view.stop()
+    return view
+
+
+class ComponentRouter:
+    def __init__(self, perf=None):
+        self.routes = {}
+        self.perf = perf  # perf.Perf; clicks are timed per prefix
+
+    def route(self, prefix):
+        def decorator(handler):
+            self.routes[prefix] = handler
+            return handler
+        return decorator
+
+    async def dispatch(self, interaction: discord.Interaction) -> bool:
+        if interaction.type != discord.InteractionType.component:
+            return False
+        match = CUSTOM_ID_PATTERN.fullmatch((interaction.data or {}).get("custom_id", ""))
+        if not match:
+            return False
+        handler = self.routes.get(match.group(1))
+        if handler is None:
+            return False
+        args = match.group(2).split(":") if match.group(2) else []
+        if self.perf is None:
+            await handler(interaction, *args)
+        else:
+            async with self.perf.timed("component", match.group(1)):
+                await handler(interaction, *args)
+        return True
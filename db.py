@@ -0,0 +1,58 @@
+import asyncio
+import os
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+
+# Small SQLite wrapper shared by the bot's local stores. Every database gets
+# one worker thread that owns the connection, so queries never block the event
+# loop and never need locking.
+
+
+class Database:
+    def __init__(self, path: str, schema: str = "", migrations=()):
+        self.path = path
+        self.schema = schema
+        self.migrations = migrations  # Statements like ALTER TABLE ... ADD COLUMN, applied once
+        self._conn = None
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"sqlite-{os.path.basename(path)}")
+
+    def _connect(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        conn = sqlite3.connect(self.path)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        if self.schema:
+            conn.executescript(self.schema)
+            conn.commit()
+        for statement in self.migrations:
+            try:
+                conn.execute(statement)
+                conn.commit()
+            except sqlite3.OperationalError:
+                pass  # Already applied
+        return conn
+
+    def _call(self, fn, args):
+        if self._conn is None:
+            self._conn = self._connect()
+        return fn(self._conn, *args)
+
+    async def run(self, fn, *args):
+        # fn(conn, *args) runs on the database thread
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, self._call, fn, args)
+
+    def run_sync(self, fn, *args):
+        # For startup code that runs before the event loop exists
+        return self._executor.submit(self._call, fn, args).result()
+
+    def close(self):
+        def _close(conn):
+            conn.close()
+        if self._conn is not None:
+            self._executor.submit(self._call, _close, ()).result()
+            self._conn = None
+        self._executor.shutdown(wait=True)
@@ -0,0 +1,90 @@
+import asyncio
+import logging
+import time
+from collections import Counter
+
+import discord
+
+from outbound import Priority
+
+log = logging.getLogger(__name__)
+
+# Welcome DMs for new members. Joins are queued and one worker sends them at
+# a steady pace (token bucket), so a raid or promo surge doesn't turn into a
+# burst of DMs that trips Discord's spam detection. Rejoiners within the
+# dedupe window aren't DMed again. The sends themselves go through the
+# outbound scheduler as Priority.DM, behind everything else.
+
+
+class TokenBucket:
+    def __init__(self, rate, burst):
+        self.rate = rate  # tokens per second
+        self.burst = burst
+        self._tokens = burst
+        self._last = time.monotonic()
+
+    async def take(self):
+        while True:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class DMQueue:
+    def __init__(self, outbound, make_message, rate=0.5, burst=5, dedupe_window=3600, maxsize=1000):
+        self.outbound = outbound
+        self.make_message = make_message  # member -> kwargs for member.send()
+        self.bucket = TokenBucket(rate, burst)
+        self.dedupe_window = dedupe_window
+        self.stats = Counter()  # queued, sent, failed, skipped_rejoin, dropped
+        self._queue = asyncio.Queue(maxsize)
+        self._recent = {}  # member id -> monotonic time it was queued
+        self._task = None
+
+    def __len__(self):
+        return self._queue.qsize()
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    def submit(self, member):
+        now = time.monotonic()
+        if len(self._recent) > 10_000:
+            self._recent = {k: t for k, t in self._recent.items() if now - t < self.dedupe_window}
+        if now - self._recent.get(member.id, float("-inf")) < self.dedupe_window:
+            self.stats["skipped_rejoin"] += 1
+            return False
+        try:
+            self._queue.put_nowait(member)
+        except asyncio.QueueFull:
+            self.stats["dropped"] += 1
+            return False
+        self._recent[member.id] = now
+        self.stats["queued"] += 1
+        return True
+
+    async def _run(self):
+        while True:
+            member = await self._queue.get()
+            try:
+                await self.bucket.take()
+                await self.outbound.run(Priority.DM, ("dm", member.id), lambda: member.send(**self.make_message(member)))
+                self.stats["sent"] += 1
+            except discord.Forbidden:
+                self.stats["failed"] += 1  # DMs closed
+            except Exception:
+                self.stats["failed"] += 1
+                log.exception("Welcome DM failed", extra={"member_id": member.id})
+            finally:
+                self._queue.task_done()
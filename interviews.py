@@ -0,0 +1,137 @@
+import json
+import time
+
+from db import Database
+
+# In-progress DM interviews. The in-memory dict is the source of truth while
+# the bot runs; changes are written behind to SQLite in batches so a restart
+# can pick every applicant up at the question they were on.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS interview_sessions (
+    user_id INTEGER PRIMARY KEY,
+    answers TEXT NOT NULL,
+    updated_at REAL NOT NULL
+);
+"""
+
+
+class SessionStore:
+    def __init__(self, path: str):
+        self.db = Database(path, SCHEMA)
+        self.sessions = {}  # user id -> {"q0": answer, ...}
+        self.updated = {}  # user id -> last change time
+        self._dirty = set()
+
+    def __contains__(self, user_id):
+        return user_id in self.sessions
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, user_id):
+        return self.sessions.get(user_id)
+
+    def _touch(self, user_id):
+        self.updated[user_id] = time.time()
+        self._dirty.add(user_id)
+
+    def start(self, user_id):
+        self.sessions[user_id] = {}
+        self._touch(user_id)
+
+    def set_answer(self, user_id, key, value):
+        self.sessions[user_id][key] = value
+        self._touch(user_id)
+
+    def pop(self, user_id):
+        self.updated.pop(user_id, None)
+        self._dirty.add(user_id)
+        return self.sessions.pop(user_id, None)
+
+    async def load(self, max_age: float):
+        # Rehydrate sessions touched within max_age seconds; older ones are dropped
+        def _load(conn, cutoff):
+            conn.execute("DELETE FROM interview_sessions WHERE updated_at < ?", (cutoff,))
+            conn.commit()
+            return conn.execute("SELECT user_id, answers, updated_at FROM interview_sessions").fetchall()
+
+        for row in await self.db.run(_load, time.time() - max_age):
+            self.sessions[row["user_id"]] = json.loads(row["answers"])
+            self.updated[row["user_id"]] = row["updated_at"]
+        return list(self.sessions)
+
+    async def flush(self):
+        if not self._dirty:
+            return
+        dirty, self._dirty = self._dirty, set()
+        upserts, deletes = [], []
+        for user_id in dirty:
+            if user_id in self.sessions:
+                upserts.append((user_id, json.dumps(self.sessions[user_id]), self.updated[user_id]))
+            else:
+                deletes.append((user_id,))
+
+        def _write(conn, upserts, deletes):
+            with conn:
+                conn.executemany("INSERT OR REPLACE INTO interview_sessions VALUES (?, ?, ?)", upserts)
+                conn.executemany("DELETE FROM interview_sessions WHERE user_id = ?", deletes)
+
+        try:
+            await self.db.run(_write, upserts, deletes)
+        except Exception:
+            self._dirty |= dirty  # Try again on the next flush
+            raise
+
+
+# Outcomes of feeding input to the engine
+IGNORED = "ignored"  # Not an applicant, or stale input
+ANSWERED = "answered"  # Recorded; ask the next question
+NEEDS_CHOICE = "needs_choice"  # Current question is answered with the dropdown
+
+
+class InterviewEngine:
+    # Explicit state machine over SessionStore. The state of an applicant is
+    # just the index of the question they're on (= answers given so far), so
+    # handling a DM is one dict lookup no matter how many interviews are open.
+    # Per-question timeouts are scheduled by the caller.
+
+    def __init__(self, store: SessionStore, question_count: int, dropdown_questions: dict):
+        self.store = store
+        self.question_count = question_count
+        self.dropdown_questions = dropdown_questions
+
+    def __contains__(self, user_id):
+        return user_id in self.store
+
+    def start(self, user_id):
+        self.store.start(user_id)
+
+    def current_index(self, user_id):
+        return len(self.store.get(user_id))
+
+    def is_complete(self, user_id):
+        return self.current_index(user_id) >= self.question_count
+
+    def on_text(self, user_id, content: str):
+        answers = self.store.get(user_id)
+        if answers is None:
+            return IGNORED
+        q_index = len(answers)
+        if q_index >= self.question_count:
+            return IGNORED
+        if q_index in self.dropdown_questions:
+            return NEEDS_CHOICE
+        self.store.set_answer(user_id, f"q{q_index}", content)
+        return ANSWERED
+
+    def on_choice(self, user_id, q_index: int, value: str):
+        # Dropdown answer; anything but the current question's dropdown is stale
+        answers = self.store.get(user_id)
+        if answers is None or len(answers) != q_index or value not in self.dropdown_questions.get(q_index, ()):
+            return IGNORED
+        self.store.set_answer(user_id, f"q{q_index}", value)
+        return ANSWERED
+
+    def finish(self, user_id):
+        return self.store.pop(user_id)
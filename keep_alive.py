@@ -1,18 +1,73 @@
-from flask import Flask
-from threading import Thread
+import asyncio
+import json
+import logging
+import math
 import os
 
-app = Flask(__name__)
+log = logging.getLogger(__name__)
 
-@app.route('/')
-def home():
-    return "Bot is alive!"
+# Small HTTP server on the bot's own event loop, for uptime pingers and
+# monitoring:
+#   /         "Bot is alive!" for uptime pingers
+#   /healthz  gateway state and heartbeat latency as JSON; 503 while disconnected
+#   /metrics  Prometheus text format, from a metrics.Registry
 
-def run():
-    port = int(os.environ.get("PORT", 8080))
-    app.run(host='0.0.0.0', port=port)
+MAX_REQUEST_BYTES = 8192
 
-def keep_alive():
-    t = Thread(target=run)
-    t.start()
 
+def _response(status, body, content_type="text/plain; charset=utf-8"):
+    body = body.encode()
+    head = (
+        f"HTTP/1.1 {status}\r\n"
+        f"Content-Type: {content_type}\r\n"
+        f"Content-Length: {len(body)}\r\n"
+        "Connection: close\r\n\r\n"
+    )
+    return head.encode() + body
+
+
+def health(bot):
+    latency = bot.latency
+    connected = bot.is_ready() and not bot.is_closed() and math.isfinite(latency)
+    return connected, {
+        "status": "ok" if connected else "disconnected",
+        "ready": bot.is_ready(),
+        "closed": bot.is_closed(),
+        "latency_ms": round(latency * 1000, 1) if math.isfinite(latency) else None,
+        "guilds": len(bot.guilds),
+    }
+
+
+async def keep_alive(bot, registry, port=None):
+    port = port or int(os.environ.get("PORT", 8080))
+
+    async def handle(reader, writer):
+        try:
+            head = await asyncio.wait_for(reader.readuntil(b"\r\n\r\n"), timeout=5)
+            method, path, _ = head[:MAX_REQUEST_BYTES].split(b"\r\n", 1)[0].decode("latin-1").split(" ", 2)
+            path = path.split("?", 1)[0]
+            if method not in ("GET", "HEAD"):
+                response = _response("405 Method Not Allowed", "Method not allowed")
+            elif path == "/":
+                response = _response("200 OK", "Bot is alive!")
+            elif path == "/healthz":
+                connected, body = health(bot)
+                response = _response("200 OK" if connected else "503 Service Unavailable", json.dumps(body),
+                                     "application/json")
+            elif path == "/metrics":
+                response = _response("200 OK", registry.render(), "text/plain; version=0.0.4; charset=utf-8")
+            else:
+                response = _response("404 Not Found", "Not found")
+            if method == "HEAD":
+                response = response.split(b"\r\n\r\n", 1)[0] + b"\r\n\r\n"
+            writer.write(response)
+            await writer.drain()
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError,
+                ConnectionError):
+            pass  # Bad or abandoned request
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "0.0.0.0", port, limit=MAX_REQUEST_BYTES)
+    log.info("Health server listening on port %d", port)
+    return server
@@ -0,0 +1,117 @@
+import re
+import time
+
+from db import Database
+
+# Every ban, jail and faction-cooldown log the bot posts is also written
+# here, so a player's history comes from an FTS5 index instead of scrolling
+# the log channels. Rows are keyed by the log message id, so re-importing the
+# same message is a no-op.
+
+BAN = "ban"
+JAIL = "jail"
+FC = "fc"
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS entries (
+    id INTEGER PRIMARY KEY,
+    kind TEXT NOT NULL,
+    player TEXT NOT NULL,
+    user_id INTEGER,
+    moderator_id INTEGER,
+    moderator TEXT NOT NULL DEFAULT '',
+    duration TEXT NOT NULL DEFAULT '',
+    until TEXT NOT NULL DEFAULT '',
+    reason TEXT NOT NULL DEFAULT '',
+    channel_id INTEGER,
+    message_id INTEGER UNIQUE,
+    created_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS entries_player ON entries(player COLLATE NOCASE);
+CREATE VIRTUAL TABLE IF NOT EXISTS entries_fts USING fts5(
+    player, reason, moderator, content='entries', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS entries_ai AFTER INSERT ON entries BEGIN
+    INSERT INTO entries_fts (rowid, player, reason, moderator) VALUES (new.id, new.player, new.reason, new.moderator);
+END;
+CREATE TRIGGER IF NOT EXISTS entries_ad AFTER DELETE ON entries BEGIN
+    INSERT INTO entries_fts (entries_fts, rowid, player, reason, moderator)
+    VALUES ('delete', old.id, old.player, old.reason, old.moderator);
+END;
+CREATE TABLE IF NOT EXISTS backfill_checkpoints (
+    channel_id INTEGER PRIMARY KEY,
+    last_message_id INTEGER NOT NULL
+);
+"""
+
+COLUMNS = ("kind", "player", "user_id", "moderator_id", "moderator", "duration", "until", "reason",
+           "channel_id", "message_id", "created_at")
+INSERT = f"INSERT OR IGNORE INTO entries ({', '.join(COLUMNS)}) VALUES ({', '.join('?' * len(COLUMNS))})"
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def player_query(player: str):
+    # "John_Doe" -> player : "john doe" *  (the tokenizer splits on "_", the last word may be partial)
+    tokens = TOKEN_PATTERN.findall(player.lower())
+    if not tokens:
+        return None
+    return 'player : "' + " ".join(tokens) + '" *'
+
+
+class Ledger:
+    def __init__(self, path: str):
+        self.db = Database(path, SCHEMA)
+
+    async def record(self, kind, player, reason="", moderator_id=None, moderator="", duration="", until="",
+                     user_id=None, channel_id=None, message_id=None, created_at=None):
+        row = (kind, player, user_id, moderator_id, moderator, duration, until, reason,
+               channel_id, message_id, created_at or time.time())
+
+        def _record(conn, row):
+            conn.execute(INSERT, row)
+            conn.commit()
+        await self.db.run(_record, row)
+
+    async def record_many(self, rows, checkpoint=None):
+        # rows: tuples in COLUMNS order, all in one transaction; returns how many were new.
+        # checkpoint: (channel id, last message id) saved in the same transaction, for backfills.
+        def _record_many(conn, rows, checkpoint):
+            with conn:
+                added = conn.executemany(INSERT, rows).rowcount if rows else 0
+                if checkpoint:
+                    conn.execute("INSERT OR REPLACE INTO backfill_checkpoints VALUES (?, ?)", checkpoint)
+                return added
+        return await self.db.run(_record_many, rows, checkpoint)
+
+    async def checkpoint(self, channel_id):
+        def _checkpoint(conn, channel_id):
+            row = conn.execute(
+                "SELECT last_message_id FROM backfill_checkpoints WHERE channel_id = ?", (channel_id,)
+            ).fetchone()
+            return row[0] if row else None
+        return await self.db.run(_checkpoint, channel_id)
+
+    async def history(self, player: str, limit=15, count_limit=1000):
+        # -> (entries for the player, newest first; total matches, counted up to count_limit).
+        # Exact name matches come first via the player index; prefix matches fill the rest from
+        # FTS5, newest rowid first, so neither query has to sort every match.
+        query = player_query(player)
+        if query is None:
+            return [], 0
+
+        def _history(conn, query, player, limit, count_limit):
+            rows = conn.execute(
+                "SELECT * FROM entries WHERE player = ? COLLATE NOCASE ORDER BY id DESC LIMIT ?", (player, limit)
+            ).fetchall()
+            seen = {r["id"] for r in rows}
+            if len(rows) < limit:
+                rows += [r for r in conn.execute(
+                    "SELECT e.* FROM (SELECT rowid FROM entries_fts WHERE entries_fts MATCH ? ORDER BY rowid DESC LIMIT ?) f "
+                    "JOIN entries e ON e.id = f.rowid ORDER BY e.id DESC",
+                    (query, limit + len(seen))
+                ) if r["id"] not in seen][:limit - len(rows)]
+            total = conn.execute(
+                "SELECT COUNT(*) FROM (SELECT 1 FROM entries_fts WHERE entries_fts MATCH ? LIMIT ?)", (query, count_limit)
+            ).fetchone()[0]
+            return [dict(r) for r in rows], total
+        return await self.db.run(_history, query, player, limit, count_limit)
@@ -0,0 +1,83 @@
+import atexit
+import datetime
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+from collections import Counter
+
+# Logging for the whole bot. Handlers on the event loop only put the record on
+# a queue; formatting (JSON, one object per line) and the actual write happen
+# on the QueueListener's thread, so a slow stdout never stalls the loop.
+# Busy loggers can be sampled: only every Nth INFO/DEBUG record is kept, and
+# kept records carry "sample_rate" so counts can be scaled back up.
+
+_RECORD_FIELDS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": datetime.datetime.fromtimestamp(record.created, datetime.timezone.utc).isoformat(timespec="milliseconds"),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RECORD_FIELDS:
+                entry[key] = value  # extra={...}
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    def __init__(self, rate):
+        super().__init__()
+        self.rate = rate
+        self._seen = Counter()
+
+    def filter(self, record):
+        if record.levelno >= logging.WARNING:
+            return True
+        self._seen[record.name] += 1
+        if self._seen[record.name] % self.rate:
+            return False
+        record.sample_rate = self.rate
+        return True
+
+
+class _DeferredQueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() formats the message here, on the caller's thread; the listener does it instead
+        return record
+
+
+def setup_logging(level=logging.INFO, sample_rates=None, stream=None):
+    # sample_rates: {logger name: keep 1 in N}. Returns the listener (stopped at exit).
+    log_queue = queue.SimpleQueue()
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    listener = logging.handlers.QueueListener(log_queue, output, respect_handler_level=True)
+
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+    root.addHandler(_DeferredQueueHandler(log_queue))
+    root.setLevel(level)
+
+    for name, rate in (sample_rates or {}).items():
+        logging.getLogger(name).addFilter(SamplingFilter(rate))
+
+    listener.start()
+    atexit.register(_stop, listener)
+    return listener
+
+
+def _stop(listener):
+    # Flushes whatever is still queued; safe if the listener was already stopped
+    if listener._thread is not None:
+        listener.stop()
@@ -4,13 +4,32 @@ from discord import app_commands
 from discord import ui, Interaction, TextStyle, Embed, Color
 import os
 from keep_alive import keep_alive
-from discord.ui import View, Button
+import metrics
+from perf import Perf, InstrumentedBot, LoopLagMonitor, TimedView, TimedModal
+from proof_downloads import ProofDownloader, SkippedProof, fit_budget
+from proof_store import ProofStore
+from phash_index import HammingIndex
+import proof_media
+from interviews import SessionStore, InterviewEngine, ANSWERED, NEEDS_CHOICE
+from responder import Responder, deadline_misses, expired_interactions
+from component_router import ComponentRouter, custom_id, routed_view
+from outbound import OutboundScheduler, Priority, DebouncedEditor, BatchSender
+from review_index import ReviewIndex
+from polls import PollStore, ALREADY_VOTED, ALREADY_VOTED_OPTION, CLOSED
+from scheduler import Scheduler, parse_deadline
+from moderation import ModerationQueue
+from spam_guard import SpamGuard, FLOOD
+from permissions import PermissionIndex, Privilege
+from dm_queue import DMQueue
+import ledger
+from backfill import backfill_channel
 import datetime
+import time
 import asyncio
-import traceback
+import io
 import re
 import logging
-logging.basicConfig(level=logging.ERROR)
+from logs import setup_logging
 
 # === CONFIG ===
 TOKEN = os.getenv("DISCORD_BOT_TOKEN")
@@ -40,111 +59,363 @@ ACCEPTED_ROLE_ID = 1347946934308176013
 PENDING_ROLE_ID = 1346488381500166194
 REVIEW_VIDEO_CHANNEL_ID = 1346488640523472958
 
+DATA_DIR = os.getenv("BOT_DATA_DIR", "data")  # Local databases and stored proofs
+
+# Proof forwarding limits
+PROOF_DOWNLOAD_CONCURRENCY = 4  # Attachments fetched in parallel per forward
+PROOF_SPOOL_THRESHOLD = 8 * 1024 * 1024  # Bigger files are spooled to disk instead of RAM
+PROOF_BYTE_BUDGET = 25 * 1024 * 1024  # Max bytes re-uploaded per forward, if the guild allows that much
+PROOF_UPLOAD_HEADROOM = 512 * 1024  # Kept free of the guild's upload limit for the preview thumbnail
+PHASH_MAX_BYTES = 20 * 1024 * 1024  # Larger images are not perceptually hashed
+PHASH_MAX_DISTANCE = 8  # Bits of difference (out of 64) still counted as "similar"
+
+# Optional recompression of oversized proof images (needs Pillow)
+PROOF_TRANSCODE_ENABLED = os.getenv("PROOF_TRANSCODE", "1") == "1"
+PROOF_TRANSCODE_THRESHOLD = 4 * 1024 * 1024  # Images bigger than this get recompressed
+PROOF_JPEG_QUALITY = 82
+PROOF_MAX_DIMENSION = 2560  # Long side in pixels after recompression
+PROOF_PREVIEW_SIZE = 480  # Preview thumbnail shown in the report embed
+
+# Interview sessions
+INTERVIEW_FLUSH_SECONDS = 2  # Write-behind interval for in-progress interviews
+INTERVIEW_RESUME_MAX_AGE = 24 * 3600  # Older sessions are dropped instead of resumed after a restart
+INTERVIEW_ANSWER_TIMEOUT = 300  # Seconds an applicant has to answer each question
+QUEUE_PAGE_SIZE = 10  # Applications per /queue page
+POLL_LIVE_EDIT_INTERVAL = 5  # Live poll results are edited at most once per this many seconds
+DEADLINE_TIMEZONE = datetime.timezone(datetime.timedelta(hours=5, minutes=30))  # Dates typed into logs are IST
+WHITELIST_ANNOUNCE_WINDOW = 3  # Members whitelisted within this many seconds share one announcement
+JOIN_DM_RATE = 0.5  # Welcome DMs per second once the burst allowance is spent
+JOIN_DM_BURST = 5
+JOIN_DM_DEDUPE_SECONDS = 3600  # Members who rejoin within this window aren't DMed again
+JOIN_DM_QUEUE_SIZE = 1000  # Joins beyond this many pending DMs are dropped
+LOOP_LAG_INTERVAL = 0.25  # How often the event loop is checked for stalls
+LOOP_LAG_THRESHOLD = 0.1  # Waking up this many seconds late counts as a stall
+MEDIA_WARNING_SECONDS = 5  # How long the "media only" warning stays up
+MEDIA_WARNING_COOLDOWN = 10  # One warning per user per channel within this many seconds
+MEDIA_DELETE_WINDOW = 1.5  # Deletes in a channel within this many seconds go out as one bulk delete
+
+# Spam detection (spam_guard.py)
+SPAM_WINDOW = 5  # Seconds of history looked at per user
+SPAM_MAX_MESSAGES = 6  # Messages inside the window that count as flooding
+SPAM_MAX_DUPLICATES = 3  # Copies of the same text inside the window
+SPAM_TRACKED_USERS = 10_000  # Least recently active users are forgotten beyond this
+SPAM_ACTION = os.getenv("SPAM_ACTION", "flag")  # "flag" posts to the log channel, "timeout" also times the user out
+SPAM_TIMEOUT = datetime.timedelta(minutes=10)
+
+# Logging (logs.py): JSON lines written from a background thread
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_SAMPLE_ON_MESSAGE = 100  # Keep 1 in this many per-message log lines
+
+setup_logging(LOG_LEVEL, {"bot.on_message": LOG_SAMPLE_ON_MESSAGE})
+log = logging.getLogger("bot")
+message_log = logging.getLogger("bot.on_message")
+
 intents = discord.Intents.default()
 intents.message_content = True
 intents.guilds = True
 intents.members = True
 
-bot = commands.Bot(command_prefix="!", intents=intents, allowed_mentions=discord.AllowedMentions(everyone=False, roles=True, users=True))
+# Every command, component click and event handler is timed (perf.py); see /perf
+perf = Perf()
+bot = InstrumentedBot(perf, command_prefix="!", intents=intents, allowed_mentions=discord.AllowedMentions(everyone=False, roles=True, users=True))
+loop_lag_monitor = LoopLagMonitor(perf, LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD)
+
+# The event loop only holds weak references to tasks, so fire-and-forget work is kept here until it finishes
+background_tasks = set()
+
+def spawn(coro):
+    task = bot.loop.create_task(coro)
+    background_tasks.add(task)
+    task.add_done_callback(background_tasks.discard)
+    return task
+
+proof_downloader = ProofDownloader(
+    concurrency=PROOF_DOWNLOAD_CONCURRENCY,
+    spool_threshold=PROOF_SPOOL_THRESHOLD,
+    byte_budget=PROOF_BYTE_BUDGET
+)
+proof_store = ProofStore(os.path.join(DATA_DIR, "proofs"))
+component_router = ComponentRouter(perf)
+outbound = OutboundScheduler()  # Every message the bot sends on its own goes through here, by priority
+review_index = ReviewIndex(os.path.join(DATA_DIR, "reviews.db"))
+poll_store = PollStore(os.path.join(DATA_DIR, "polls.db"))
+poll_editor = DebouncedEditor(POLL_LIVE_EDIT_INTERVAL)
+scheduler = Scheduler(os.path.join(DATA_DIR, "scheduler.db"))
+phash_index = HammingIndex(max_distance=PHASH_MAX_DISTANCE)
+spam_guard = SpamGuard(SPAM_WINDOW, SPAM_MAX_MESSAGES, SPAM_MAX_DUPLICATES, SPAM_TRACKED_USERS)
+metrics_registry = metrics.Registry()  # Served on /metrics by keep_alive.py
+moderation_ledger = ledger.Ledger(os.path.join(DATA_DIR, "ledger.db"))
+permission_index = PermissionIndex({
+    SAY_ROLE_ID: Privilege.SAY,
+    ADMIN_LOG_ROLE_ID: Privilege.ADMIN_LOG,
+    ALLOWED_ROLE_ID: Privilege.ALLOWED,
+    REVIEWER_ROLE_ID: Privilege.REVIEWER,
+})
+requires = permission_index.require  # @requires(Privilege.X) works on prefix and slash commands
 
 
 # Remove default help command to avoid conflict
 bot.remove_command("help")
 
+@bot.event
+async def setup_hook():
+    for digest, h in await proof_store.load_phashes():
+        phash_index.add(h, digest)
+
+    await interview_sessions.load(INTERVIEW_RESUME_MAX_AGE)
+    flush_interview_sessions.start()
+
+    # Timed work; jobs that came due while the bot was offline fire straight away
+    await scheduler.load()
+    for poll_data in await poll_store.open_with_deadline():
+        await scheduler.schedule("poll_close", poll_data["id"], poll_data["deadline"], {"poll_id": poll_data["id"]})
+    # Resumed interviews get a fresh answer window; their old timeouts may have lapsed while offline
+    for user_id in interview_sessions.sessions:
+        await scheduler.schedule(
+            "interview_timeout", user_id, time.time() + INTERVIEW_ANSWER_TIMEOUT,
+            {"user_id": user_id, "q_index": interview_engine.current_index(user_id)}
+        )
+    spawn(start_scheduler())
+    spawn(resume_interviews())
+    join_dm_queue.start()
+    bot.health_server = await keep_alive(bot, metrics_registry)
+    loop_lag_monitor.start()
+
+_discord_close = bot.close
+
+async def close_bot():
+    # Runs on shutdown (and again from discord.py's runner, hence the guard)
+    if bot.is_closed():
+        return
+    flush_interview_sessions.stop()  # Lets a flush in progress finish
+
+    # Stop everything that may still write to a database before the databases close
+    await scheduler.stop()
+    await join_dm_queue.stop()
+    await loop_lag_monitor.stop()
+    await poll_editor.stop()
+    leftovers = [task for task in (*background_tasks, backfill_task) if task and not task.done()]
+    for task in leftovers:
+        task.cancel()  # The backfill resumes from its checkpoint next time
+    flush_task = flush_interview_sessions.get_task()
+    await asyncio.gather(*leftovers, *([flush_task] if flush_task else []), return_exceptions=True)
+
+    await _discord_close()
+    try:
+        await interview_sessions.flush()  # Write-behind: don't lose the last few answers
+    except Exception:
+        log.exception("Failed to save interview sessions on shutdown")
+    if getattr(bot, "health_server", None):
+        bot.health_server.close()
+    await proof_downloader.close()
+    proof_media.shutdown()
+    for store in (interview_sessions, scheduler, proof_store, review_index, poll_store, moderation_ledger):
+        await asyncio.to_thread(store.db.close)
+
+bot.close = close_bot
+
 @bot.event
 async def on_ready():
     try:
         await bot.tree.sync()  # Global sync
-        print("✅ Globally synced all slash commands.")
-    except Exception as e:
-        print(f"Error syncing slash commands: {e}")
+        log.info("Globally synced all slash commands")
+    except Exception:
+        log.exception("Error syncing slash commands")
+
+# Persistent buttons/selects are routed by custom_id (see component_router.py)
+@bot.listen("on_interaction")
+async def route_components(interaction: discord.Interaction):
+    try:
+        await component_router.dispatch(interaction)
+    except Exception:
+        log.exception("Component handler failed", extra={"custom_id": (interaction.data or {}).get("custom_id")})
+
+async def start_scheduler():
+    # Handlers talk to Discord, so wait for the cache before firing anything
+    await bot.wait_until_ready()
+    scheduler.start()
+
+@scheduler.handler("delete_message")
+async def delete_message_job(channel_id, message_id):
+    # Rides along with the channel's next bulk delete (moderation.py)
+    channel = bot.get_channel(channel_id)
+    if channel:
+        moderation_queue.delete_later(channel, message_id)
 
 #----------Date TIme Handler ----------
 def format_datetime(dt: datetime.datetime):
     return dt.strftime("%Y-%m-%d %H:%M:%S")
 
+# ----------- Permission index ---------------
+@bot.listen("on_ready")
+async def load_permission_index():
+    guild = bot.get_guild(GUILD_ID)
+    if guild:
+        permission_index.load(guild)
+
+@bot.listen("on_member_remove")
+async def forget_member_permissions(member):
+    permission_index.forget(member.id)
+
+# Deleting or editing a role fires no on_member_update for its members, so rebuild from the guild
+@bot.listen("on_guild_role_delete")
+async def reload_permissions_on_role_delete(role):
+    if role.id in permission_index.role_privileges:
+        permission_index.load(role.guild)
+
+@bot.listen("on_guild_role_update")
+async def reload_permissions_on_role_update(before, after):
+    if after.id in permission_index.role_privileges:
+        permission_index.load(after.guild)
+
 # ----------- WHITELIST LOG ---------------
+async def announce_whitelisted(members):
+    embed = discord.Embed(
+        title="__𝗪𝗛𝗜𝗧𝗘𝗟𝗜𝗦𝗧𝗘𝗗__",
+        description=(
+            "𝗬𝗼𝘂𝗿 𝗮𝗰𝗰𝗼𝘂𝗻𝘁 𝗶𝘀 𝘄𝗵𝗶𝘁𝗲𝗹𝗶𝘀𝘁𝗲𝗱 𝗘𝗻𝗷𝗼𝘆 𝗥𝗣\n\n"
+            + "\n".join(member.mention for member in members) + "\n\n"
+            " 𝗬𝗼𝘂𝗿 𝗥𝗼𝗹𝗲𝗽𝗹𝗮𝘆 𝗕𝗲𝗴𝗶𝗻𝘀.\n"
+            "```UNDER CITY ROLEPLAY```"
+        ),
+        color=discord.Color.from_rgb(93, 238, 14)
+    )
+    embed.set_image(url="https://cdn.discordapp.com/attachments/1372059707694645360/1396137859890679941/standardwh.gif?ex=687cfe34&is=687bacb4&hm=cabb6b4e4d9720933972af6ae6d0e1d047e1582d7b99cc1a6f1f7629b797ecc7&")
+
+    channel = bot.get_channel(WHITELIST_LOG_CHANNEL_ID)
+    if channel:
+        await outbound.send(Priority.ANNOUNCEMENT, channel, embed=embed)
+
+# Mass whitelisting produces one announcement per burst instead of one per member
+whitelist_announcer = BatchSender(announce_whitelisted, WHITELIST_ANNOUNCE_WINDOW)
+
 @bot.event
 async def on_member_update(before, after):
-    before_roles = set(before.roles)
-    after_roles = set(after.roles)
-
-    # Check if the whitelisted role was just added
-    newly_added_roles = after_roles - before_roles
-    for role in newly_added_roles:
-        if role.id == WHITELISTED_ROLE_ID:
-            embed = discord.Embed(
-                title="__𝗪𝗛𝗜𝗧𝗘𝗟𝗜𝗦𝗧𝗘𝗗__",
-                description=(
-                    "𝗬𝗼𝘂𝗿 𝗮𝗰𝗰𝗼𝘂𝗻𝘁 𝗶𝘀 𝘄𝗵𝗶𝘁𝗲𝗹𝗶𝘀𝘁𝗲𝗱 𝗘𝗻𝗷𝗼𝘆 𝗥𝗣\n\n"
-                    f"{after.mention}\n\n"
-                    " 𝗬𝗼𝘂𝗿 𝗥𝗼𝗹𝗲𝗽𝗹𝗮𝘆 𝗕𝗲𝗴𝗶𝗻𝘀.\n"
-                    "```UNDER CITY ROLEPLAY```"
-                ),
-                color=discord.Color.from_rgb(93, 238, 14)
-            )
-            embed.set_image(url="https://cdn.discordapp.com/attachments/1372059707694645360/1396137859890679941/standardwh.gif?ex=687cfe34&is=687bacb4&hm=cabb6b4e4d9720933972af6ae6d0e1d047e1582d7b99cc1a6f1f7629b797ecc7&")
+    # Most updates are nicknames, avatars, timeouts; get_role is a lookup in the member's role ids
+    if after.get_role(WHITELISTED_ROLE_ID) is not None and before.get_role(WHITELISTED_ROLE_ID) is None:
+        whitelist_announcer.add(after)
 
-            channel = after.guild.get_channel(WHITELIST_LOG_CHANNEL_ID)
-            if channel:
-                await channel.send(embed=embed)
-            break
+    permission_index.update(after)
 
 
 # ------- JOIN DM --------------------
+WELCOME_EMBED = discord.Embed(
+    title="Welcome to UNDERCITY ROLEPLAY <a:emoji_86:1369557989618614332>",
+    description=(
+        "<a:Animated_Arrow_Bluelite:1395826655368577134> Head to <#1359819992383885322> and attend a whitelist **interview** with an admin.\n"
+        "<a:Animated_Arrow_Bluelite:1395826655368577134> Once **approved**, get the **server IP** from <#1346488630822174721>.\n"
+        "<a:Animated_Arrow_Bluelite:1395826655368577134> Use the IP to join the game and register your in-game name.\n"
+        "<a:Animated_Arrow_Bluelite:1395826655368577134> Then go to <#1347888335758164049> and apply for **in-game whitelist** using the format given there.\n\n"
+        "🔐 Make sure you follow the steps in order. Only approved users will receive access to RP.\n\n"
+        "Good luck and welcome again!"
+    ),
+    color=discord.Color.teal()
+)
+WELCOME_EMBED.set_footer(text="UNDERCITY ROLEPLAY")
+WELCOME_EMBED.set_thumbnail(url="https://cdn.discordapp.com/attachments/1372059707694645360/1396061147333005343/image.png?ex=687cb6c3&is=687b6543&hm=fc75c086cd82bcc804fe4a0df0d1cb2426195154ed77f15ddbd00cebc62e49f5&")
+
+# Paced by dm_queue.py, then sent at the lowest outbound priority
+join_dm_queue = DMQueue(
+    outbound,
+    lambda member: {"embed": WELCOME_EMBED},
+    rate=JOIN_DM_RATE,
+    burst=JOIN_DM_BURST,
+    dedupe_window=JOIN_DM_DEDUPE_SECONDS,
+    maxsize=JOIN_DM_QUEUE_SIZE
+)
+
 @bot.event
 async def on_member_join(member: discord.Member):
     if member.bot:
         return  # Skip bots
 
-    embed = discord.Embed(
-        title="Welcome to UNDERCITY ROLEPLAY <a:emoji_86:1369557989618614332>",
-        description=(
-            "<a:Animated_Arrow_Bluelite:1395826655368577134> Head to <#1359819992383885322> and attend a whitelist **interview** with an admin.\n"
-            "<a:Animated_Arrow_Bluelite:1395826655368577134> Once **approved**, get the **server IP** from <#1346488630822174721>.\n"
-            "<a:Animated_Arrow_Bluelite:1395826655368577134> Use the IP to join the game and register your in-game name.\n"
-            "<a:Animated_Arrow_Bluelite:1395826655368577134> Then go to <#1347888335758164049> and apply for **in-game whitelist** using the format given there.\n\n"
-            "🔐 Make sure you follow the steps in order. Only approved users will receive access to RP.\n\n"
-            "Good luck and welcome again!"
-        ),
-        color=discord.Color.teal()
-    )
-    embed.set_footer(text="UNDERCITY ROLEPLAY")
-    embed.set_thumbnail(url="https://cdn.discordapp.com/attachments/1372059707694645360/1396061147333005343/image.png?ex=687cb6c3&is=687b6543&hm=fc75c086cd82bcc804fe4a0df0d1cb2426195154ed77f15ddbd00cebc62e49f5&")
-
-    try:
-        await member.send(embed=embed)
-        print(f"✅ Sent whitelist DM to {member.name}")
-    except discord.Forbidden:
-        print(f"❌ Could not DM {member.name} (DMs disabled)")
+    join_dm_queue.submit(member)
 
 # -------- Shared Forwardproof Handler --------
-async def handle_forward_proof(ctx, reporter, accused, replied_msg):
-    is_interaction = isinstance(ctx, discord.Interaction)
+def proof_upload_limit(channel):
+    # Discord rejects the whole message (413) once its files exceed the guild's limit,
+    # which is 10 MiB until boost tier 2
+    limit = channel.guild.filesize_limit if channel else PROOF_BYTE_BUDGET
+    return min(limit, PROOF_BYTE_BUDGET) - PROOF_UPLOAD_HEADROOM
 
+async def handle_forward_proof(reply: Responder, reporter, accused, replied_msg):
     if not replied_msg:
-        msg = "❌ Please reply to the message containing the proof."
-        return await ctx.response.send_message(msg, ephemeral=True) if is_interaction else await ctx.send(msg)
+        return await reply.send("❌ Please reply to the message containing the proof.")
 
     if not replied_msg.attachments:
-        msg = "❌ No attachments found in the replied message."
-        return await ctx.response.send_message(msg, ephemeral=True) if is_interaction else await ctx.send(msg)
+        return await reply.send("❌ No attachments found in the replied message.")
 
     if not replied_msg.channel.name.startswith(TICKET_CHANNEL_PREFIX):
-        msg = "❌ This command can only be used in ticket channels."
-        return await ctx.response.send_message(msg, ephemeral=True) if is_interaction else await ctx.send(msg)
+        return await reply.send("❌ This command can only be used in ticket channels.")
+
+    # Attachments we've hashed before don't need downloading again
+    known = await proof_store.lookup_attachments(a.id for a in replied_msg.attachments)
+    to_fetch = [a for a in replied_msg.attachments if a.id not in known]
+    proof_channel = bot.get_channel(PROOF_CHANNEL_ID)
+    upload_limit = proof_upload_limit(proof_channel)
+    # Only images can shrink below the upload limit (by recompression); everything else is capped by it up front
+    fixed = [a for a in to_fetch if not (PROOF_TRANSCODE_ENABLED and (a.content_type or "").startswith("image"))]
+    too_big = {a.id for a in fit_budget(fixed, upload_limit, lambda a: a.size)[1]}
+    downloaded, skipped = await proof_downloader.fetch_all(
+        [a for a in to_fetch if a.id not in too_big], PROOF_BYTE_BUDGET
+    )
+    skipped += [SkippedProof(a, "over upload limit") for a in to_fetch if a.id in too_big]
+
+    # Same content forwarded from another message/ticket
+    filed = await proof_store.lookup_digests({d.digest for d in downloaded})
+    new_proofs = []
+    for d in downloaded:
+        if d.digest in filed:
+            known[d.attachment.id] = filed[d.digest]
+            d.close()
+        else:
+            new_proofs.append(d)
+    await proof_store.link_attachments((a_id, row["digest"]) for a_id, row in known.items())
+
+    # Near-duplicates: re-cropped / re-compressed images already on file
+    hashable = [d for d in new_proofs if d.is_image and d.size <= PHASH_MAX_BYTES]
+    hashes = await asyncio.gather(*(proof_media.perceptual_hash(d.read()) for d in hashable))
+    new_phashes = [(d.digest, h) for d, h in zip(hashable, hashes) if h is not None]
+    similar = {}
+    for digest, h in new_phashes:
+        for distance, match in phash_index.search(h):
+            if match != digest and distance < similar.get(match, PHASH_MAX_DISTANCE + 1):
+                similar[match] = distance
+    similar_rows = await proof_store.lookup_digests(similar.keys())
 
-    attachments = replied_msg.attachments
     image_preview = None
-    files = []
-
-    for i, attachment in enumerate(attachments):
-        file = await attachment.to_file()
-        if i == 0 and attachment.content_type.startswith("image"):
-            image_preview = attachment.url
-            files.append(file)
-        else:
-            files.append(file)
+    first = replied_msg.attachments[0]
+    if (first.content_type or "").startswith("image"):
+        image_preview = first.url
+
+    # Recompress oversized screenshots in the media pool and attach a light preview
+    bytes_saved = 0
+    extra_files = []
+    if PROOF_TRANSCODE_ENABLED:
+        oversized = [d for d in new_proofs if d.is_image and d.size > PROOF_TRANSCODE_THRESHOLD]
+        results = await asyncio.gather(
+            *(proof_media.transcode(d.read(), PROOF_JPEG_QUALITY, PROOF_MAX_DIMENSION) for d in oversized)
+        )
+        for d, data in zip(oversized, results):
+            if data:
+                bytes_saved += d.size - len(data)
+                d.upload = (data, os.path.splitext(d.filename)[0] + ".jpg")
+
+    # What actually gets uploaded has to fit the guild's limit after recompression; the rest is linked
+    new_proofs, over_limit = fit_budget(new_proofs, upload_limit, lambda d: d.upload_size)
+    for d in over_limit:
+        skipped.append(SkippedProof(d.attachment, "over upload limit"))
+        d.close()
+    uploaded = {d.digest for d in new_proofs}
+    new_phashes = [(digest, h) for digest, h in new_phashes if digest in uploaded]
+
+    if PROOF_TRANSCODE_ENABLED:
+        first_proof = next((d for d in new_proofs if d.attachment.id == first.id), None)
+        if first_proof and first_proof.is_image:
+            preview = await proof_media.thumbnail(first_proof.read(), PROOF_PREVIEW_SIZE)
+            if preview:
+                extra_files.append(discord.File(io.BytesIO(preview), filename="preview.jpg"))
+                image_preview = "attachment://preview.jpg"
 
     embed = discord.Embed(
         title="FRP Report",
@@ -156,22 +427,68 @@ async def handle_forward_proof(ctx, reporter, accused, replied_msg):
     embed.add_field(name="Message", value=replied_msg.content or "(No text provided)", inline=False)
     embed.add_field(
     name="Handled By",
-    value=(ctx.user.mention if is_interaction else ctx.author.mention),
+    value=reply.author.mention,
     inline=False
     )
     embed.set_thumbnail(url="https://cdn.discordapp.com/attachments/1372059707694645360/1393578650015760516/491878536_605875318625766_7662976636025833179_n.png")
 
+    duplicates = list(known.values())
+    other_tickets = [row for row in duplicates if row["ticket_channel_id"] != replied_msg.channel.id]
+    if duplicates:
+        embed.add_field(
+            name="Already Filed",
+            value="\n".join(f"[{row['filename']}]({row['proof_jump_url']}) – from #{row['ticket_name']}" for row in duplicates)[:1024],
+            inline=False
+        )
+
+    if similar_rows:
+        embed.add_field(
+            name="Similar Proofs On File",
+            value="\n".join(
+                f"[{row['filename']}]({row['proof_jump_url']}) – #{row['ticket_name']} ({similar[digest]} bit diff)"
+                for digest, row in similar_rows.items()
+            )[:1024],
+            inline=False
+        )
+
+    if skipped:
+        # Link anything we didn't re-upload so the proof isn't lost
+        embed.add_field(
+            name="Not Re-uploaded",
+            value="\n".join(f"[{s.attachment.filename}]({s.attachment.url}) – {s.reason}" for s in skipped)[:1024],
+            inline=False
+        )
+
     if image_preview:
         embed.set_image(url=image_preview)
 
     try:
-        channel = bot.get_channel(PROOF_CHANNEL_ID)
-        await channel.send(embed=embed, files=files)
+        sent = await outbound.run(Priority.MODERATION, ("send", proof_channel.id), lambda: proof_channel.send(
+            embed=embed, files=[d.to_file() for d in new_proofs] + extra_files
+        ))
+        await proof_store.record(new_proofs, sent, replied_msg.channel)
+        await proof_store.record_phashes(new_phashes)
+        for digest, h in new_phashes:
+            phash_index.add(h, digest)
         success_msg = "✅ Proof forwarded successfully!"
-        await ctx.response.send_message(success_msg, ephemeral=True) if is_interaction else await ctx.send(success_msg)
+        if duplicates:
+            success_msg += f"\n♻️ {len(duplicates)} attachment(s) were already filed and linked instead of re-uploaded."
+        if other_tickets:
+            success_msg += "\n⚠️ Same evidence already appears in another report: " + ", ".join(
+                f"{row['proof_jump_url']} (#{row['ticket_name']})" for row in other_tickets
+            )
+        if bytes_saved:
+            success_msg += f"\n🗜️ Recompressed oversized images, saved {bytes_saved / (1024 * 1024):.1f} MB."
+        if similar_rows:
+            success_msg += f"\n🔍 {len(similar_rows)} similar proof(s) already filed – see the report embed."
+        if skipped:
+            success_msg += f"\n⚠️ {len(skipped)} attachment(s) were linked instead of re-uploaded."
+        await reply.send(success_msg)
     except Exception as e:
-        err_msg = f"❌ Failed to forward proof.\nError: `{e}`"
-        await ctx.response.send_message(err_msg, ephemeral=True) if is_interaction else await ctx.send(err_msg)
+        await reply.send(f"❌ Failed to forward proof.\nError: `{e}`")
+    finally:
+        for d in new_proofs:
+            d.close()
 
 
 # --------- Emoji Say Handler ---------
@@ -188,12 +505,9 @@ def resolve_emojis(message: discord.Message) -> str:
     return content
 
 # -------- Shared Say Handler --------
-async def handle_say(ctx, title, channel, replied_msg):
-    is_interaction = isinstance(ctx, discord.Interaction)
-
+async def handle_say(reply: Responder, title, channel, replied_msg):
     if not replied_msg:
-        msg = "❌ Please reply to a message to use this command."
-        return await ctx.response.send_message(msg, ephemeral=True) if is_interaction else await ctx.send(msg)
+        return await reply.send("❌ Please reply to a message to use this command.")
 
     embed = discord.Embed(
         title=title,
@@ -204,24 +518,22 @@ async def handle_say(ctx, title, channel, replied_msg):
     embed.set_thumbnail(url="https://cdn.discordapp.com/attachments/1372059707694645360/1393578650015760516/491878536_605875318625766_7662976636025833179_n.png")
 
     try:
-        await channel.send(embed=embed)
-        success_msg = f"✅ Embed sent to {channel.mention}"
-        await ctx.response.send_message(success_msg, ephemeral=True) if is_interaction else await ctx.send(success_msg)
+        await outbound.send(Priority.ANNOUNCEMENT, channel, embed=embed)
+        await reply.send(f"✅ Embed sent to {channel.mention}")
     except Exception as e:
-        err_msg = f"❌ Failed to send embed.\nError: `{e}`"
-        await ctx.response.send_message(err_msg, ephemeral=True) if is_interaction else await ctx.send(err_msg)
+        await reply.send(f"❌ Failed to send embed.\nError: `{e}`")
 
 
 # -------- Prefix Commands --------
 @bot.command()
-@commands.has_role(ALLOWED_ROLE_ID)
+@requires(Privilege.ALLOWED)
 async def forwardproof(ctx, reporter: str = None, accused: str = None):
     if not reporter or not accused:
         return await ctx.send("❌ Usage: `!forwardproof <reporter> <accused>` (reply to the proof message)")
 
     if ctx.message.reference:
         replied_msg = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-        await handle_forward_proof(ctx, reporter, accused, replied_msg)
+        await handle_forward_proof(Responder(ctx), reporter, accused, replied_msg)
     else:
         await ctx.send("❌ Please reply to the proof message.")
 
@@ -246,90 +558,171 @@ async def userinfo(ctx, member: discord.Member = None):
 
 
 @bot.command()
-@commands.has_role(SAY_ROLE_ID)
+@requires(Privilege.SAY)
 async def say(ctx, channel: discord.TextChannel = None, *, title: str = None):
     if not title or not channel:
         return await ctx.send("❌ Usage: `!say <#channel> <title>` (reply to a message)")
 
     if ctx.message.reference:
         replied_msg = await ctx.channel.fetch_message(ctx.message.reference.message_id)
-        await handle_say(ctx, title, channel, replied_msg)
+        await handle_say(Responder(ctx), title, channel, replied_msg)
     else:
         await ctx.send("❌ Please reply to a message.")
 
 # -------- Log Commands ----------
 
-@bot.command()
-@commands.has_role(ADMIN_LOG_ROLE_ID)
-async def banlog(ctx, player_name: str = None, ban_days: str = None, unban: str = None, *, reason: str = None):
-    if not all([player_name, ban_days, unban, reason]):
-        return await ctx.send("❌ Usage: `!banlog <player_name> <ban_days> <unban> <reason>`")
-
-    msg = (
+# Unban dates and cooldown ends are free text; when they parse to a future time, a reminder is scheduled for them
+def future_deadline(text, now):
+    due = parse_deadline(text, now, DEADLINE_TIMEZONE)
+    return due if due and due > now else None  # A backdated or mistyped date would fire straight away
+
+async def schedule_unban_reminder(player_name, ban_days, unban, moderator):
+    # ban_days is only a fallback when no unban was given; "No Unban" / "Permanent" mean no reminder
+    due = future_deadline(unban.strip() or ban_days, time.time())
+    if due:
+        await scheduler.schedule("unban_due", player_name.lower(), due, {"player_name": player_name, "moderator_id": moderator.id})
+    return due
+
+async def schedule_fc_reminder(ign, cooldown_end, discord_user):
+    due = future_deadline(cooldown_end, time.time())
+    if due:
+        await scheduler.schedule("fc_cooldown_end", ign.lower(), due, {"ign": ign, "user_id": discord_user.id})
+    return due
+
+def reminder_note(due):
+    return f" ⏰ Reminder set for <t:{int(due)}:f>." if due else ""
+
+# Shared by the prefix and slash versions; backfill.py parses these templates when importing old logs
+def ban_log_message(player_name, ban_days, unban, moderator, reason):
+    return (
         f"# PLAYER BAN\n\n"
         f"> **`PLAYER NAME: {player_name}`   \n"
         f"> BAN DAYS: {ban_days} \n"
         f"> UNBAN: {unban} \n"
-        f"> BANNED BY: {ctx.author.mention}**\n"
+        f"> BANNED BY: {moderator.mention}**\n"
         f"> \n"
         f"> **REASON: {reason}**\n"
         f"<@&{MENTION_ROLE_ID}>"
     )
 
+def jail_log_message(player_name, discord_user, minutes, moderator, reason):
+    return (
+        f"# PLAYER JAIL\n\n"
+        f"> **`PLAYER NAME: {player_name}\n"
+        f"> `DISCORD:` {discord_user.mention}  \n"
+        f"> \n"
+        f"> Was Prisoned For {minutes} Min's by {moderator.mention} \n"
+        f"> \n"
+        f"> Reason: {reason}"
+    )
+
+def fc_log_message(ign, reason, cooldown_end, discord_user):
+    return (
+        f"## FACTION COOLDOWN NOTICE\n"
+        f"> `In-Game Name: {ign}`\n"
+        f"> Reason: ` {reason}`\n"
+        f"> Cooldown End: ` {cooldown_end}`\n"
+        f"> Player Mention {discord_user.mention} \n"
+        f"> **OPEN TICKET AFTER COOLDOWN END**"
+    )
+
+async def post_moderation_log(kind, channel_id, msg, moderator, player, reason, duration="", until="", user=None):
+    # Posts the log and writes the same entry to the ledger behind /history
+    channel = bot.get_channel(channel_id)
+    sent = await outbound.send(Priority.MODERATION, channel, msg)
+    await moderation_ledger.record(
+        kind, player, reason, moderator_id=moderator.id, moderator=moderator.name, duration=duration, until=until,
+        user_id=user.id if user else None, channel_id=channel.id, message_id=sent.id
+    )
+
+@scheduler.handler("unban_due")
+async def unban_due_job(player_name, moderator_id):
+    channel = bot.get_channel(BAN_LOG_CHANNEL_ID)
+    if channel:
+        await outbound.send(Priority.MODERATION, channel, f"⏰ **UNBAN DUE** – `{player_name}` (banned by <@{moderator_id}>)")
+
+@scheduler.handler("fc_cooldown_end")
+async def fc_cooldown_end_job(ign, user_id):
+    channel = bot.get_channel(FC_LOG_CHANNEL_ID)
+    if channel:
+        await outbound.send(Priority.MODERATION, channel, f"⏰ **FACTION COOLDOWN ENDED** – `{ign}` <@{user_id}> may now open a ticket.")
+
+@bot.command()
+@requires(Privilege.ADMIN_LOG)
+async def banlog(ctx, player_name: str = None, ban_days: str = None, unban: str = None, *, reason: str = None):
+    if not all([player_name, ban_days, unban, reason]):
+        return await ctx.send("❌ Usage: `!banlog <player_name> <ban_days> <unban> <reason>`")
+
+    msg = ban_log_message(player_name, ban_days, unban, ctx.author, reason)
+
     try:
-        channel = bot.get_channel(BAN_LOG_CHANNEL_ID)
-        await channel.send(msg)
-        await ctx.send("✅ Ban log sent.")
+        await post_moderation_log(ledger.BAN, BAN_LOG_CHANNEL_ID, msg, ctx.author, player_name, reason, ban_days, unban)
+        due = await schedule_unban_reminder(player_name, ban_days, unban, ctx.author)
+        await ctx.send("✅ Ban log sent." + reminder_note(due))
     except Exception as e:
         await ctx.send(f"❌ Failed to send.\n`{str(e)}`")
 
 
 @bot.command()
-@commands.has_role(ADMIN_LOG_ROLE_ID)
+@requires(Privilege.ADMIN_LOG)
 async def jaillog(ctx, player_name: str = None, discord_user: discord.Member = None, minutes: str = None, *, reason: str = None):
     if not all([player_name, discord_user, minutes, reason]):
         return await ctx.send("❌ Usage: `!jaillog <player_name> <@user> <minutes> <reason>`")
 
-    msg = (
-        f"# PLAYER JAIL\n\n"
-        f"> **`PLAYER NAME: {player_name}\n"
-        f"> `DISCORD:` {discord_user.mention}  \n"
-        f"> \n"
-        f"> Was Prisoned For {minutes} Min's by {ctx.author.mention} \n"
-        f"> \n"
-        f"> Reason: {reason}"
-    )
+    msg = jail_log_message(player_name, discord_user, minutes, ctx.author, reason)
 
     try:
-        channel = bot.get_channel(JAIL_LOG_CHANNEL_ID)
-        await channel.send(msg)
+        await post_moderation_log(ledger.JAIL, JAIL_LOG_CHANNEL_ID, msg, ctx.author, player_name, reason, minutes,
+                                  user=discord_user)
         await ctx.send("✅ Jail log sent.")
     except Exception as e:
         await ctx.send(f"❌ Failed to send.\n`{str(e)}`")
 
 
 @bot.command()
-@commands.has_role(ADMIN_LOG_ROLE_ID)
+@requires(Privilege.ADMIN_LOG)
 async def fclog(ctx, ign: str = None, reason: str = None, cooldown_end: str = None, discord_user: discord.Member = None):
     if not all([ign, reason, cooldown_end, discord_user]):
         return await ctx.send("❌ Usage: `!fclog <in_game_name> <reason> <cooldown_end_date> <@user>`")
 
-    msg = (
-        f"## FACTION COOLDOWN NOTICE\n"
-        f"> `In-Game Name: {ign}`\n"
-        f"> Reason: ` {reason}`\n"
-        f"> Cooldown End: ` {cooldown_end}`\n"
-        f"> Player Mention {discord_user.mention} \n"
-        f"> **OPEN TICKET AFTER COOLDOWN END**"
-    )
+    msg = fc_log_message(ign, reason, cooldown_end, discord_user)
 
     try:
-        channel = bot.get_channel(FC_LOG_CHANNEL_ID)
-        await channel.send(msg)
-        await ctx.send("✅ FC log sent.")
+        await post_moderation_log(ledger.FC, FC_LOG_CHANNEL_ID, msg, ctx.author, ign, reason, until=cooldown_end,
+                                  user=discord_user)
+        due = await schedule_fc_reminder(ign, cooldown_end, discord_user)
+        await ctx.send("✅ FC log sent." + reminder_note(due))
     except Exception as e:
         await ctx.send(f"❌ Failed to send.\n`{str(e)}`")
 
+# -------- ledger backfill ---------
+# Imports the log channels' history into the ledger; safe to interrupt and run again
+backfill_task = None
+
+@bot.command()
+@commands.is_owner()
+async def backfill(ctx):
+    global backfill_task
+    if backfill_task and not backfill_task.done():
+        return await ctx.send("⏳ A backfill is already running.")
+
+    async def run():
+        for kind, channel_id in ((ledger.BAN, BAN_LOG_CHANNEL_ID), (ledger.JAIL, JAIL_LOG_CHANNEL_ID),
+                                 (ledger.FC, FC_LOG_CHANNEL_ID)):
+            channel = bot.get_channel(channel_id)
+            if not channel:
+                continue
+            try:
+                scanned, added, elapsed = await backfill_channel(moderation_ledger, channel, kind)
+            except Exception as e:
+                await ctx.send(f"❌ Backfill of {channel.mention} stopped: `{e}` – run `!backfill` again to resume.")
+                return
+            rate = scanned / elapsed if elapsed else 0
+            await ctx.send(f"✅ {channel.mention}: {scanned} messages read, {added} entries added ({rate:.0f} msg/s).")
+
+    backfill_task = bot.loop.create_task(run())
+    await ctx.send("📥 Backfill started.")
+
 # -------- force re-sync ---------
 @bot.command()
 @commands.is_owner()
@@ -340,6 +733,25 @@ async def sync(ctx):
     except Exception as e:
         await ctx.send(f"❌ Sync failed.\n`{e}`")
 
+# -------- interaction deadline stats ---------
+@bot.command()
+@commands.is_owner()
+async def deadlines(ctx):
+    if not deadline_misses:
+        return await ctx.send("✅ No slash command has needed an auto-defer yet.")
+    lines = [f"`{name}` – {count}" for name, count in deadline_misses.most_common()]
+    await ctx.send("⏱️ Auto-deferred interactions per command:\n" + "\n".join(lines))
+
+@bot.command()
+@commands.is_owner()
+async def outboundstats(ctx):
+    lines = [
+        f"`{name}` – {jobs} sent, {outbound.depth(Priority[name.upper()])} queued, "
+        f"waited {mean_ms:.0f} ms avg / {max_ms:.0f} ms max"
+        for name, (jobs, mean_ms, max_ms) in outbound.latency().items()
+    ]
+    await ctx.send("📤 Outbound queue latency per class:\n" + "\n".join(lines))
+
 # -------- help command ------------
 @bot.command(name="help")
 async def help_command(ctx):
@@ -383,58 +795,53 @@ async def about(ctx):
 
 # ---------- DM USER COMMAND PREFIX --------------
 @bot.command(name="dm")
+@requires(Privilege.SAY)
 async def dm_embed_prefix(ctx, user: discord.User):
-    if not any(role.id == SAY_ROLE_ID for role in ctx.author.roles):
-        await ctx.reply("❌ You don’t have permission to use this.")
-        return
-
     await ctx.reply("📨 Please respond to the popup to compose the embed.", delete_after=10)
     await ctx.send_modal(DmEmbedModal(bot, ctx.author, user))
 
 # ----------- error handling ---------------
 @bot.event
 async def on_command_error(ctx, error):
-    if isinstance(error, commands.MissingPermissions):
+    if isinstance(error, (commands.MissingPermissions, commands.CheckFailure)):
         await ctx.send("❌ You don't have permission to use this command.")
     elif isinstance(error, commands.CommandNotFound):
         pass  # Ignore unknown commands
     else:
         await ctx.send("❌ An unexpected error occurred.")
-        print(f"[ERROR] {error}")
+        log.error("Prefix command failed", exc_info=error, extra={"command": ctx.command and ctx.command.qualified_name})
 
 
 # -------- Slash Commands --------
 @bot.tree.command(name="forward-proof", description="Forward proofs to Ticket-Proofs channel.")
 @app_commands.describe(reporter="Name of reporter", accused="Name of accused", message_id="Message ID of the proof")
+@requires(Privilege.ALLOWED)
 async def forward_proof_slash(interaction: discord.Interaction, reporter: str, accused: str, message_id: str):
-    if not any(role.id == ALLOWED_ROLE_ID for role in interaction.user.roles):
-        return await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
-
-    try:
-        replied_msg = await interaction.channel.fetch_message(int(message_id))
-        await handle_forward_proof(interaction, reporter, accused, replied_msg)
-    except Exception:
-        await interaction.response.send_message("❌ Could not fetch the message. Check the message ID.", ephemeral=True)
+    async with Responder(interaction) as reply:
+        try:
+            replied_msg = await interaction.channel.fetch_message(int(message_id))
+        except Exception:
+            return await reply.send("❌ Could not fetch the message. Check the message ID.")
+        await handle_forward_proof(reply, reporter, accused, replied_msg)
 
 
 @bot.tree.command(name="say")
 @app_commands.describe(title="Embed title", channel="Channel to send embed", message_id="Message ID to embed")
+@requires(Privilege.SAY)
 async def say_slash(interaction: discord.Interaction, title: str, channel: discord.TextChannel, message_id: str):
-    if not any(role.id == SAY_ROLE_ID for role in interaction.user.roles):
-        return await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
-
-    try:
-        replied_msg = await interaction.channel.fetch_message(int(message_id))
-        await handle_say(interaction, title, channel, replied_msg)
-    except Exception:
-        await interaction.response.send_message("❌ Could not fetch the message. Check the message ID.", ephemeral=True)
+    async with Responder(interaction) as reply:
+        try:
+            replied_msg = await interaction.channel.fetch_message(int(message_id))
+        except Exception:
+            return await reply.send("❌ Could not fetch the message. Check the message ID.")
+        await handle_say(reply, title, channel, replied_msg)
 
 # ----------- /sayembed -------------
 from discord import app_commands, ui, TextStyle, Interaction, Embed
 import discord
 
 # --- Modal to get basic input ---
-class EmbedModal(ui.Modal, title="📦 Create Embed"):
+class EmbedModal(TimedModal, title="📦 Create Embed"):
     title_input = ui.TextInput(label="Embed Title", style=TextStyle.short, required=True, max_length=256)
     desc_input = ui.TextInput(label="Description", style=TextStyle.paragraph, required=True, max_length=2000)
     footer_input = ui.TextInput(label="Footer (optional)", style=TextStyle.short, required=False)
@@ -449,7 +856,7 @@ class EmbedModal(ui.Modal, title="📦 Create Embed"):
 
 
     async def on_submit(self, interaction: Interaction):
-        if not any(role.id == SAY_ROLE_ID for role in interaction.user.roles):
+        if not permission_index.has(interaction.user, Privilege.SAY):
             await interaction.response.send_message("❌ You don't have permission to use this.", ephemeral=True)
             return
 
@@ -467,7 +874,7 @@ class EmbedModal(ui.Modal, title="📦 Create Embed"):
 
 
 # --- View with dropdowns & button ---
-class EmbedView(discord.ui.View):
+class EmbedView(TimedView):
     def __init__(self, bot, user, title, desc, footer, thumbnail, replied_msg, channel, interaction):
         super().__init__(timeout=180)
         self.bot = bot
@@ -500,8 +907,9 @@ class EmbedView(discord.ui.View):
         if self.thumbnail:
             embed.set_thumbnail(url=self.thumbnail)
 
-        await self.channel.send(embed=embed)
-        await interaction.response.send_message(f"✅ Embed sent to {self.channel.mention}", ephemeral=True)
+        async with Responder(interaction) as reply:
+            await outbound.send(Priority.ANNOUNCEMENT, self.channel, embed=embed)
+            await reply.send(f"✅ Embed sent to {self.channel.mention}")
 
 
 # --- Dropdown for color ---
@@ -563,11 +971,8 @@ class ChannelDropdown(ui.Select):
 # --- Slash Command ---
 @bot.tree.command(name="sayembed", description="Send a styled embed to a selected channel using a UI builder")
 @app_commands.describe(channel="The channel where the embed will be sent")
+@requires(Privilege.SAY)
 async def sayembed_ui(interaction: discord.Interaction, channel: discord.TextChannel):
-    if not any(role.id == SAY_ROLE_ID for role in interaction.user.roles):
-        await interaction.response.send_message("❌ You don’t have permission to use this.", ephemeral=True)
-        return
-
     # Store the selected channel inside the interaction context using EmbedModal
     await interaction.response.send_modal(EmbedModal(bot, interaction.user, target_channel=channel))
 
@@ -601,27 +1006,17 @@ async def userinfo_slash(interaction: discord.Interaction, user: discord.Member
     unban="Unban info (e.g. No Unban, or date)",
     reason="Reason for the ban"
 )
+@requires(Privilege.ADMIN_LOG)
 async def banlog_slash(interaction: discord.Interaction, player_name: str, ban_days: str, unban: str, reason: str):
-    if not any(role.id == ADMIN_LOG_ROLE_ID for role in interaction.user.roles):
-        return await interaction.response.send_message("❌ You don’t have permission.", ephemeral=True)
-
-    msg = (
-        f"# PLAYER BAN\n\n"
-        f"> **`PLAYER NAME: {player_name}`   \n"
-        f"> BAN DAYS: {ban_days} \n"
-        f"> UNBAN: {unban} \n"
-        f"> BANNED BY: {interaction.user.mention}**\n"
-        f"> \n"
-        f"> **REASON: {reason}**\n"
-        f"<@&{MENTION_ROLE_ID}>"
-    )
+    msg = ban_log_message(player_name, ban_days, unban, interaction.user, reason)
 
-    try:
-        channel = bot.get_channel(BAN_LOG_CHANNEL_ID)
-        await channel.send(msg)
-        await interaction.response.send_message("✅ Ban log sent.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"❌ Failed to send log.\n`{e}`", ephemeral=True)
+    async with Responder(interaction) as reply:
+        try:
+            await post_moderation_log(ledger.BAN, BAN_LOG_CHANNEL_ID, msg, interaction.user, player_name, reason, ban_days, unban)
+            due = await schedule_unban_reminder(player_name, ban_days, unban, interaction.user)
+            await reply.send("✅ Ban log sent." + reminder_note(due))
+        except Exception as e:
+            await reply.send(f"❌ Failed to send log.\n`{e}`")
 
 
 @bot.tree.command(name="jaillog", description="Post a player jail log")
@@ -631,26 +1026,17 @@ async def banlog_slash(interaction: discord.Interaction, player_name: str, ban_d
     minutes="Time in minutes",
     reason="Reason for jail"
 )
+@requires(Privilege.ADMIN_LOG)
 async def jaillog_slash(interaction: discord.Interaction, player_name: str, discord_user: discord.Member, minutes: str, reason: str):
-    if not any(role.id == ADMIN_LOG_ROLE_ID for role in interaction.user.roles):
-        return await interaction.response.send_message("❌ You don’t have permission.", ephemeral=True)
+    msg = jail_log_message(player_name, discord_user, minutes, interaction.user, reason)
 
-    msg = (
-        f"# PLAYER JAIL\n\n"
-        f"> **`PLAYER NAME: {player_name}\n"
-        f"> `DISCORD:` {discord_user.mention}  \n"
-        f"> \n"
-        f"> Was Prisoned For {minutes} Min's by {interaction.user.mention} \n"
-        f"> \n"
-        f"> Reason: {reason}"
-    )
-
-    try:
-        channel = bot.get_channel(JAIL_LOG_CHANNEL_ID)
-        await channel.send(msg)
-        await interaction.response.send_message("✅ Jail log sent.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"❌ Failed to send log.\n`{e}`", ephemeral=True)
+    async with Responder(interaction) as reply:
+        try:
+            await post_moderation_log(ledger.JAIL, JAIL_LOG_CHANNEL_ID, msg, interaction.user, player_name, reason, minutes,
+                                      user=discord_user)
+            await reply.send("✅ Jail log sent.")
+        except Exception as e:
+            await reply.send(f"❌ Failed to send log.\n`{e}`")
 
 
 @bot.tree.command(name="fclog", description="Post a faction cooldown notice")
@@ -660,25 +1046,72 @@ async def jaillog_slash(interaction: discord.Interaction, player_name: str, disc
     cooldown_end="Cooldown end date (e.g. 5/7/2025)",
     discord_user="Tag the player"
 )
+@requires(Privilege.ADMIN_LOG)
 async def fclog_slash(interaction: discord.Interaction, ign: str, reason: str, cooldown_end: str, discord_user: discord.Member):
-    if not any(role.id == ADMIN_LOG_ROLE_ID for role in interaction.user.roles):
-        return await interaction.response.send_message("❌ You don’t have permission.", ephemeral=True)
+    msg = fc_log_message(ign, reason, cooldown_end, discord_user)
 
-    msg = (
-        f"## FACTION COOLDOWN NOTICE\n"
-        f"> `In-Game Name: {ign}`\n"
-        f"> Reason: ` {reason}`\n"
-        f"> Cooldown End: ` {cooldown_end}`\n"
-        f"> Player Mention {discord_user.mention} \n"
-        f"> **OPEN TICKET AFTER COOLDOWN END**"
+    async with Responder(interaction) as reply:
+        try:
+            await post_moderation_log(ledger.FC, FC_LOG_CHANNEL_ID, msg, interaction.user, ign, reason, until=cooldown_end,
+                                      user=discord_user)
+            due = await schedule_fc_reminder(ign, cooldown_end, discord_user)
+            await reply.send("✅ FC log sent." + reminder_note(due))
+        except Exception as e:
+            await reply.send(f"❌ Failed to send log.\n`{e}`")
+
+# ------------ /history -------------
+LEDGER_LABELS = {ledger.BAN: "🔨 BAN", ledger.JAIL: "🔒 JAIL", ledger.FC: "⏳ FC"}
+
+@bot.tree.command(name="history", description="Show a player's ban, jail and faction cooldown history")
+@app_commands.describe(player="Player's in-game name (or the start of it)")
+@requires(Privilege.ADMIN_LOG)
+async def history(interaction: discord.Interaction, player: str):
+    entries, total = await moderation_ledger.history(player)
+    if not entries:
+        return await interaction.response.send_message(f"📭 No logs found for `{player}`.", ephemeral=True)
+
+    lines = []
+    for entry in entries:
+        details = " · ".join(v for v in (entry["duration"], entry["until"] and f"until {entry['until']}") if v)
+        moderator = f"<@{entry['moderator_id']}>" if entry["moderator_id"] else entry["moderator"] or "unknown"
+        lines.append(
+            f"**{LEDGER_LABELS.get(entry['kind'], entry['kind'])}** <t:{int(entry['created_at'])}:d> `{entry['player']}`"
+            + (f" · {details}" if details else "")
+            + f"\n> {entry['reason'][:200]} – by {moderator}"
+        )
+
+    embed = discord.Embed(title=f"📜 History – {player}", description="\n".join(lines)[:4096], color=discord.Color.dark_red())
+    more = "1000+" if total >= 1000 else total
+    embed.set_footer(text=f"Showing {len(entries)} of {more} matching logs")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+# ------------ /perf -------------
+@bot.tree.command(name="perf", description="Show command latency, errors and event loop stalls")
+@requires(Privilege.SAY)
+async def perf_slash(interaction: discord.Interaction):
+    embed = discord.Embed(title="⏱️ Bot Performance", color=discord.Color.blurple())
+
+    lines = [
+        f"`{kind}:{name}` – {h.count}× · avg {h.mean:.0f} ms · p95 {h.quantile(0.95):.0f} ms · max {h.max:.0f} ms"
+        + (f" · ❌ {perf.errors[(kind, name)]}" if perf.errors[(kind, name)] else "")
+        for kind, name, h in perf.slowest(12)
+    ]
+    embed.add_field(name="Slowest (by p95)", value="\n".join(lines)[:1024] or "Nothing recorded yet.", inline=False)
+
+    lag = perf.loop_lag
+    stalls = "\n".join(
+        f"<t:{int(at)}:R> {lag_ms:.0f} ms – {', '.join(suspects[:4]) or 'no handler running'}"
+        for at, lag_ms, suspects in reversed(perf.stalls)
+    )
+    embed.add_field(
+        name=f"Event loop (stalls over {LOOP_LAG_THRESHOLD * 1000:.0f} ms)",
+        value=(f"lag p99 {lag.quantile(0.99):.0f} ms · max {lag.max:.0f} ms\n" + (stalls or "No stalls."))[:1024],
+        inline=False
     )
 
-    try:
-        channel = bot.get_channel(FC_LOG_CHANNEL_ID)
-        await channel.send(msg)
-        await interaction.response.send_message("✅ FC log sent.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"❌ Failed to send log.\n`{e}`", ephemeral=True)
+    misses = ", ".join(f"`{name}` {count}" for name, count in deadline_misses.most_common(8))
+    embed.add_field(name="Auto-deferred interactions", value=misses or "None.", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
 
 # -------- /help command ----------
 @bot.tree.command(name="help", description="Show a list of bot commands and their use")
@@ -723,7 +1156,7 @@ async def about_slash(interaction: discord.Interaction):
 
 # ---------- DM USER FEATURE ----------- 
 
-class DmEmbedModal(ui.Modal, title="📨 DM Embed Builder"):
+class DmEmbedModal(TimedModal, title="📨 DM Embed Builder"):
     title_input = ui.TextInput(label="Title (optional)", style=TextStyle.short, required=False)
     desc_input = ui.TextInput(label="Description (optional)", style=TextStyle.paragraph, required=False)
     footer_input = ui.TextInput(label="Footer (optional)", style=TextStyle.short, required=False)
@@ -746,130 +1179,156 @@ class DmEmbedModal(ui.Modal, title="📨 DM Embed Builder"):
         if self.thumb_input.value:
             embed.set_thumbnail(url=self.thumb_input.value)
 
-        try:
-            await self.target_user.send(embed=embed)
-            await interaction.response.send_message(f"✅ DM sent to {self.target_user.mention}", ephemeral=True)
-        except discord.Forbidden:
-            await interaction.response.send_message("❌ Cannot send DM. The user might have DMs closed.", ephemeral=True)
+        # DMs queue behind everything else in outbound, so the reply may have to be deferred
+        async with Responder(interaction) as reply:
+            try:
+                await outbound.send(Priority.DM, self.target_user, embed=embed)
+                await reply.send(f"✅ DM sent to {self.target_user.mention}")
+            except discord.Forbidden:
+                await reply.send("❌ Cannot send DM. The user might have DMs closed.")
 
 
 # Slash command version
 dm_command = app_commands.Command
 @bot.tree.command(name="dm", description="DM a user with a custom embed")
 @app_commands.describe(user="The user to DM")
+@requires(Privilege.SAY)
 async def dm_embed_ui(interaction: discord.Interaction, user: discord.User):
-    if not any(role.id == SAY_ROLE_ID for role in interaction.user.roles):
-        await interaction.response.send_message("❌ You don’t have permission to use this.", ephemeral=True)
-        return
-
     await interaction.response.send_modal(DmEmbedModal(bot, interaction.user, user))
 
 # ------------ /poll feature -------------
+# Polls are stored in polls.py; buttons keep their poll_{id}_{label} custom_ids and are routed
+# by component_router, so they survive restarts. Closing is driven by the stored deadline.
 
-class PollButton(Button):
-    def __init__(self, label, poll_id):
-        super().__init__(label=label, style=discord.ButtonStyle.primary, custom_id=f"poll_{poll_id}_{label}")
-        self.poll_id = poll_id
-        self.label_text = label
-
-    async def callback(self, interaction: discord.Interaction):
-        poll_data = self.view.poll_data
-        voter_id = interaction.user.id
-        label = self.label_text
+def poll_view(poll_id, options, author_id):
+    buttons = [
+        discord.ui.Button(label=option, style=discord.ButtonStyle.primary, custom_id=f"poll_{poll_id}_{option}")
+        for option in options
+    ]
+    buttons.append(discord.ui.Button(label="Cancel Poll", style=discord.ButtonStyle.danger,
+                                     custom_id=custom_id("pollcancel", poll_id, author_id)))
+    return routed_view(*buttons)
 
-        if not poll_data["multiple_votes"]:
-            if voter_id in poll_data["votes"]:
-                await interaction.response.send_message("❌ You have already voted!", ephemeral=True)
-                return
-            poll_data["votes"][voter_id] = [label]
-        else:
-            current_votes = poll_data["votes"].setdefault(voter_id, [])
-            if label in current_votes:
-                await interaction.response.send_message("❌ You already voted for this option!", ephemeral=True)
-                return
-            current_votes.append(label)
 
+def poll_embed(poll_data, counts=None):
+    embed = discord.Embed(
+        title="📊 Poll",
+        description=f"**{poll_data['question']}**\n\n" + "\n".join([f"{i+1}. {opt}" for i, opt in enumerate(poll_data["options"])]),
+        color=discord.Color.blue()
+    )
+    if counts is not None:
+        total = sum(counts)
+        lines = []
+        for opt, count in zip(poll_data["options"], counts):
+            share = count / total if total else 0
+            filled = round(share * 10)
+            lines.append(f"**{opt}**\n`{'█' * filled}{'░' * (10 - filled)}` {share:.0%} ({count})")
+        embed.add_field(name=f"Live Results – {total} vote(s)", value="\n".join(lines)[:1024], inline=False)
+    embed.set_footer(text=f"Poll started by {poll_data['author_name']}")
+    return embed
+
+
+def schedule_live_results(poll_data):
+    channel = bot.get_channel(poll_data["channel_id"])
+    if not channel or not poll_data["message_id"]:
+        return
+    message = channel.get_partial_message(poll_data["message_id"])
+
+    async def edit():
+        # Read the counters when the edit actually goes out, so a burst collapses into the latest numbers
+        counts = await poll_store.counts(poll_data["id"])
+        await outbound.run(Priority.ANNOUNCEMENT, ("message", message.id),
+                           lambda: message.edit(embed=poll_embed(poll_data, counts)))
+
+    poll_editor.schedule(poll_data["id"], edit)
+
+
+@component_router.route("poll")
+async def on_poll_button(interaction: discord.Interaction, *parts):
+    # custom_id is poll_{id}_{label}; the label itself may contain ":" or "_"
+    poll_id, _, label = ":".join(parts).partition("_")
+    poll_data = await poll_store.get(poll_id)
+    if poll_data is None or poll_data["closed"] or label not in poll_data["options"]:
+        return await interaction.response.send_message("❌ This poll has ended.", ephemeral=True)
+
+    result = await poll_store.vote(poll_id, interaction.user.id, poll_data["options"].index(label))
+    if result == ALREADY_VOTED:
+        await interaction.response.send_message("❌ You have already voted!", ephemeral=True)
+    elif result == ALREADY_VOTED_OPTION:
+        await interaction.response.send_message("❌ You already voted for this option!", ephemeral=True)
+    elif result == CLOSED:
+        await interaction.response.send_message("❌ This poll has ended.", ephemeral=True)
+    else:
         await interaction.response.send_message(f"✅ You voted for **{label}**", ephemeral=True)
+        if poll_data["live"]:
+            schedule_live_results(poll_data)
 
 
-class CancelPollButton(Button):
-    def __init__(self, author_id):
-        super().__init__(label="Cancel Poll", style=discord.ButtonStyle.danger)
-        self.author_id = author_id
-
-    async def callback(self, interaction: discord.Interaction):
-        if interaction.user.id != self.author_id:
-            await interaction.response.send_message("❌ Only the poll creator can cancel this poll.", ephemeral=True)
-            return
-
-        await interaction.message.delete()
-        self.view.stop()
-        await interaction.response.send_message("✅ Poll has been cancelled.", ephemeral=True)
-
+@component_router.route("pollcancel")
+async def on_poll_cancel(interaction: discord.Interaction, poll_id, author_id):
+    if interaction.user.id != int(author_id):
+        await interaction.response.send_message("❌ Only the poll creator can cancel this poll.", ephemeral=True)
+        return
 
-class PollView(View):
-    def __init__(self, options, poll_data, bot, timeout_seconds=None):
-        super().__init__(timeout=timeout_seconds)
-        self.poll_data = poll_data
-        self.bot = bot
-        poll_id = poll_data["id"]
+    await poll_store.close(poll_id)
+    poll_store.forget(poll_id)
+    scheduler.cancel("poll_close", poll_id)
+    await interaction.message.delete()
+    await interaction.response.send_message("✅ Poll has been cancelled.", ephemeral=True)
 
-        for option in options:
-            self.add_item(PollButton(option, poll_id))
-        self.add_item(CancelPollButton(poll_data["author_id"]))
 
-    async def on_timeout(self):
-        # Calculate results
-        results = {}
-        for votes in self.poll_data["votes"].values():
-            for vote in votes:
-                results[vote] = results.get(vote, 0) + 1
+async def close_poll(poll_data):
+    if not await poll_store.close(poll_data["id"]):
+        return  # Already closed or cancelled
 
-        result_lines = [f"**{opt}** – {results.get(opt, 0)} vote(s)" for opt in self.poll_data["options"]]
+    # Results come straight from the incremental counters
+    counts = await poll_store.counts(poll_data["id"])
+    poll_store.forget(poll_data["id"])
+    result_lines = [f"**{opt}** – {count} vote(s)" for opt, count in zip(poll_data["options"], counts)]
 
-        # Create results embed
-        embed = discord.Embed(
-            title="📊 Poll Results",
-            description="\n".join(result_lines),
-            color=discord.Color.green()
-        )
-        embed.set_footer(text="This poll has ended.")
+    # Create results embed
+    embed = discord.Embed(
+        title="📊 Poll Results",
+        description="\n".join(result_lines),
+        color=discord.Color.green()
+    )
+    embed.set_footer(text="This poll has ended.")
 
-        # Send results to log channel
-        log_channel = self.bot.get_channel(LOG_CHANNEL_ID)
-        if log_channel:
-            await log_channel.send(embed=embed)
+    # Send results to log channel
+    log_channel = bot.get_channel(LOG_CHANNEL_ID)
+    if log_channel:
+        await outbound.send(Priority.ANNOUNCEMENT, log_channel, embed=embed)
 
-        # Delete the original poll message
-        if self.message: # 'self.message' will be set when the view is sent
-            try:
-                await self.message.delete()
-            except discord.NotFound:
-                print("Poll message not found, likely already deleted.")
-            except discord.Forbidden:
-                print("Bot does not have permissions to delete the poll message.")
-            except Exception as e:
-                print(f"An error occurred while deleting the poll message: {e}")
+    # Delete the original poll message
+    channel = bot.get_channel(poll_data["channel_id"])
+    if channel and poll_data["message_id"]:
+        try:
+            await outbound.run(Priority.ANNOUNCEMENT, ("delete", channel.id),
+                               channel.get_partial_message(poll_data["message_id"]).delete)
+        except discord.NotFound:
+            log.info("Poll message not found, likely already deleted", extra={"poll_id": poll_data["id"]})
+        except discord.Forbidden:
+            log.warning("No permission to delete the poll message", extra={"poll_id": poll_data["id"]})
+        except Exception:
+            log.exception("Failed to delete the poll message", extra={"poll_id": poll_data["id"]})
 
 
-# Slash command to create a poll
-# Assuming 'bot' is your discord.ext.commands.Bot instance
-# Replace 'bot' with your actual bot variable if it's named differently
-# And make sure you have LOG_CHANNEL_ID defined.
+@scheduler.handler("poll_close")
+async def poll_close_job(poll_id):
+    poll_data = await poll_store.get(poll_id)
+    if poll_data:
+        await close_poll(poll_data)
 
-# Example placeholder for bot and LOG_CHANNEL_ID if not already defined:
-# from discord.ext import commands
-# bot = commands.Bot(command_prefix="!", intents=discord.Intents.all())
-# LOG_CHANNEL_ID = 123456789012345678 # Replace with your actual log channel ID
 
 @bot.tree.command(name="poll", description="Create a poll with up to 10 options.")
 @app_commands.describe(
     question="The question to ask",
     options="Comma-separated list of 2–10 options",
     duration="How long the poll should last (e.g., 1d, 2h, 30m, never)",
-    multiple_votes="Allow multiple votes per user (yes/no)"
+    multiple_votes="Allow multiple votes per user (yes/no)",
+    live_results="Show a live results bar on the poll (yes/no)"
 )
-async def poll(interaction: discord.Interaction, question: str, options: str, duration: str = "5m", multiple_votes: str = "no"):
+async def poll(interaction: discord.Interaction, question: str, options: str, duration: str = "5m", multiple_votes: str = "no", live_results: str = "no"):
     option_list = [opt.strip() for opt in options.split(",") if opt.strip()]
     if len(option_list) < 2 or len(option_list) > 10:
         await interaction.response.send_message("❌ Please provide between 2 and 10 options.", ephemeral=True)
@@ -879,6 +1338,10 @@ async def poll(interaction: discord.Interaction, question: str, options: str, du
         await interaction.response.send_message("❌ Please specify `yes` or `no` for multiple_votes.", ephemeral=True)
         return
 
+    if live_results.lower() not in ["yes", "no"]:
+        await interaction.response.send_message("❌ Please specify `yes` or `no` for live_results.", ephemeral=True)
+        return
+
     # Parse duration
     timeout_seconds = None
     if duration.lower() != "never":
@@ -899,54 +1362,56 @@ async def poll(interaction: discord.Interaction, question: str, options: str, du
 
     # Poll data setup
     poll_id = str(interaction.id)
-    poll_data = {
-        "id": poll_id,
-        "author_id": interaction.user.id,
-        "options": option_list,
-        "votes": {},
-        "multiple_votes": multiple_votes.lower() == "yes",
-        "channel": interaction.channel
-    }
-
-    embed = discord.Embed(
-        title="📊 Poll",
-        description=f"**{question}**\n\n" + "\n".join([f"{i+1}. {opt}" for i, opt in enumerate(option_list)]),
-        color=discord.Color.blue()
+    deadline = time.time() + timeout_seconds if timeout_seconds is not None else None
+    await poll_store.create(
+        poll_id, interaction.channel_id, interaction.user.id, interaction.user.display_name, question,
+        option_list, multiple_votes.lower() == "yes", deadline, live_results.lower() == "yes"
     )
-    embed.set_footer(text=f"Poll started by {interaction.user.display_name}")
+    poll_data = await poll_store.get(poll_id)
+    embed = poll_embed(poll_data, [0] * len(option_list) if poll_data["live"] else None)
 
-    view = PollView(option_list, poll_data, bot, timeout_seconds)
-    # Store the message reference in the view
-    await interaction.response.send_message(embed=embed, view=view)
+    await interaction.response.send_message(embed=embed, view=poll_view(poll_id, option_list, interaction.user.id))
     message = await interaction.original_response()
-    view.message = message # Assign the message to the view
+    await poll_store.set_message(poll_id, message.id)
+    if deadline is not None:
+        await scheduler.schedule("poll_close", poll_id, deadline, {"poll_id": poll_id})
 
 # Sync the commands
 @bot.event
 async def on_ready():
     await bot.tree.sync()
-    print(f"Bot is ready: {bot.user}")
+    log.info("Bot is ready: %s", bot.user)
 
 @bot.event
 async def on_app_command_error(interaction: discord.Interaction, error):
     await interaction.response.send_message("An unexpected error occurred.", ephemeral=True)
-    print(f"App Command Error: {error}")
+    log.error("App command error", exc_info=error)
+
+@bot.listen("on_app_command_completion")
+async def record_slash_latency(interaction: discord.Interaction, command):
+    perf.finish_interaction(interaction)
 
 # ------------ error handling -----------
 
 @bot.tree.error
 async def on_app_command_error(interaction: discord.Interaction, error: app_commands.AppCommandError):
-    # Print the full error to your console
-    traceback.print_exception(type(error), error, error.__traceback__)
-    
+    perf.finish_interaction(interaction, error=True)
+    if isinstance(error, app_commands.CheckFailure):
+        if not interaction.response.is_done():
+            await interaction.response.send_message("❌ You don't have permission to use this command.", ephemeral=True)
+        return
+
+    log.error("Slash command failed", exc_info=error,
+              extra={"command": interaction.command and interaction.command.qualified_name})
+
     # Send error message to user
     try:
         if interaction.response.is_done():
             await interaction.followup.send("❌ An error occurred while executing the command.", ephemeral=True)
         else:
             await interaction.response.send_message("❌ An error occurred while executing the command.", ephemeral=True)
-    except Exception as e:
-        print("❌ Failed to send error message:", e)
+    except Exception:
+        log.exception("Failed to send error message")
 
 
 # ------------ SERVER WHITELIST ----------
@@ -970,71 +1435,142 @@ async def wh(interaction: discord.Interaction, user: discord.Member, nickname: s
     if whitelisted_role is None or interview_role is None:
         return await interaction.response.send_message("❌ One or both roles not found.", ephemeral=True)
 
-    try:
-        await user.add_roles(whitelisted_role)
-        await user.remove_roles(interview_role)
-        await user.edit(nick=nickname)
-        await interaction.response.send_message(
-            f"✅ {user.mention} has been whitelisted and renamed to `{nickname}`.",
-            ephemeral=True
-        )
-    except discord.Forbidden:
-        await interaction.response.send_message("❌ I don't have permission to manage this user.", ephemeral=True)
-    except Exception as e:
-        await interaction.response.send_message(f"❌ Error: {str(e)}", ephemeral=True)
+    async with Responder(interaction) as reply:
+        try:
+            await user.add_roles(whitelisted_role)
+            await user.remove_roles(interview_role)
+            await user.edit(nick=nickname)
+            await reply.send(f"✅ {user.mention} has been whitelisted and renamed to `{nickname}`.")
+        except discord.Forbidden:
+            await reply.send("❌ I don't have permission to manage this user.")
+        except Exception as e:
+            await reply.send(f"❌ Error: {str(e)}")
 
 # ------------- Auto Delete Messages in Trolls and insta ---------------
+# Deletes and warnings run in the background (moderation.py) so commands are never held up
+def media_warning_embed(members):
+    # One warning covers everyone caught in the same flush
+    mentions = ", ".join(member.mention for member in members)
+    return discord.Embed(
+        description=f"❌ {mentions}, please don’t chat in this channel. It's only for in-game media posts.",
+        color=discord.Color.red()
+    )
+
+async def schedule_warning_delete(warning_msg):
+    await scheduler.schedule(
+        "delete_message", warning_msg.id, time.time() + MEDIA_WARNING_SECONDS,
+        {"channel_id": warning_msg.channel.id, "message_id": warning_msg.id}
+    )
+
+moderation_queue = ModerationQueue(
+    outbound, media_warning_embed, schedule_warning_delete, MEDIA_WARNING_COOLDOWN, MEDIA_DELETE_WINDOW
+)
+
+async def handle_spam(message, verdict):
+    member = message.author
+    if member.guild_permissions.manage_messages:
+        return  # Staff
+
+    reason = "Flooding messages" if verdict == FLOOD else "Repeating the same message"
+    timed_out = False
+    if SPAM_ACTION == "timeout":
+        try:
+            await member.timeout(SPAM_TIMEOUT, reason=f"Spam: {reason}")
+            timed_out = True
+        except discord.Forbidden:
+            log.warning("Missing permission to time out member", extra={"member_id": member.id})
+
+    log_channel = bot.get_channel(LOG_CHANNEL_ID)
+    if log_channel:
+        embed = discord.Embed(title="🚨 Spam Detected", color=discord.Color.orange())
+        embed.add_field(name="User", value=f"{member.mention} ({member.id})", inline=False)
+        embed.add_field(name="Channel", value=message.channel.mention, inline=True)
+        embed.add_field(name="Reason", value=reason, inline=True)
+        embed.add_field(name="Action", value=f"Timed out for {SPAM_TIMEOUT}" if timed_out else "Flagged", inline=True)
+        if message.content:
+            embed.add_field(name="Last Message", value=message.content[:1000], inline=False)
+        await outbound.send(Priority.MODERATION, log_channel, embed=embed)
+
 @bot.event
 async def on_message(message):
     if message.author.bot:
         return
+    message_log.info("Message", extra={"channel_id": message.channel.id, "author_id": message.author.id,
+                                       "attachments": len(message.attachments)})
+
+    # Guild messages only; a few list comparisons per message, acting on a hit happens off the hot path
+    if message.guild is not None:
+        verdict = spam_guard.check(message.author.id, message.content, time.monotonic())
+        if verdict:
+            spawn(handle_spam(message, verdict))
+
+    # Interview answers arrive as DMs; one dict lookup routes them to the applicant's session
+    if isinstance(message.channel, discord.DMChannel) and message.author.id in interview_engine:
+        await handle_interview_answer(message)
+        return
 
     # Channel IDs to monitor
     monitored_channels = [1346488677441732700, 1346488679035834460]
-    # Role ID that can bypass this (staff role with /sayembed access)
-    staff_role_id = 1346488355486961694
 
     if message.channel.id in monitored_channels:
-        # Check if user has staff role
-        is_staff = any(role.id == staff_role_id for role in message.author.roles)
+        # Staff (the /sayembed role) may chat here
+        is_staff = permission_index.has(message.author, Privilege.SAY)
 
         # If not staff and message has no attachments (text-only message)
         if not is_staff and len(message.attachments) == 0:
-            await message.delete()
-
-            # Reminder embed
-            embed = discord.Embed(
-                description=f"❌ {message.author.mention}, please don’t chat in this channel. It's only for in-game media posts.",
-                color=discord.Color.red()
-            )
-
-            # Send reminder and delete after 5 seconds
-            warning_msg = await message.channel.send(embed=embed)
-            await asyncio.sleep(5)
-            await warning_msg.delete()
+            moderation_queue.submit(message)
 
     await bot.process_commands(message)
 
 # ------------ INTERVIEW APPLICATION FEATURE ------------------
-# Store user sessions
-interview_sessions = {}
+# Store user sessions (persisted, see interviews.py)
+interview_sessions = SessionStore(os.path.join(DATA_DIR, "interviews.db"))
 
-class InterviewPanelView(discord.ui.View):
-    def __init__(self):
-        super().__init__(timeout=None)
+@tasks.loop(seconds=INTERVIEW_FLUSH_SECONDS)
+async def flush_interview_sessions():
+    try:
+        await interview_sessions.flush()
+    except Exception:
+        log.exception("Failed to save interview sessions")
 
-    @discord.ui.button(label="Start Interview", style=discord.ButtonStyle.green)
-    async def start(self, interaction: discord.Interaction, button: discord.ui.Button):
+async def resume_interviews():
+    # Pick up interviews that were in progress when the bot went down
+    await bot.wait_until_ready()
+    for user_id in list(interview_sessions.sessions):
+        try:
+            user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+            await user.send("🔄 The bot was restarted – continuing your interview where you left off.")
+        except Exception:
+            log.exception("Could not resume interview", extra={"user_id": user_id})
+            interview_engine.finish(user_id)
+            continue
+        await ask_next_question(user)
+
+def interview_panel_view():
+    return routed_view(
+        discord.ui.Button(label="Start Interview", style=discord.ButtonStyle.green, custom_id=custom_id("interview", "start"))
+    )
+
+@component_router.route("interview")
+async def on_interview_component(interaction: discord.Interaction, action, *args):
+    if action == "start":
         try:
             await interaction.response.send_message("📨 Interview has started in your DMs.", ephemeral=True)
             await start_interview(interaction.user)
-        except Exception as e:
-            print("Interview error:", e)
+        except Exception:
+            log.exception("Interview error", extra={"user_id": interaction.user.id})
             try:
                 await interaction.followup.send("❌ Unable to start the interview due to an error or closed DMs.", ephemeral=True)
             except:
                 pass
 
+    elif action == "choice":
+        q_index = int(args[0])
+        if interview_engine.on_choice(interaction.user.id, q_index, interaction.data["values"][0]) != ANSWERED:
+            return await interaction.response.send_message("❌ This question is no longer active.", ephemeral=True)
+        await interaction.message.delete()
+        await ask_next_question(interaction.user)
+
 @bot.tree.command(name="panel", description="Send interview panel")
 @app_commands.describe(channel="Select the channel to send the panel to")
 async def panel(interaction: discord.Interaction, channel: discord.TextChannel):
@@ -1044,40 +1580,28 @@ async def panel(interaction: discord.Interaction, channel: discord.TextChannel):
         color=discord.Color.blue()
     )
     embed.set_footer(text="Undercity Roleplay | Interview System")
-    await channel.send(embed=embed, view=InterviewPanelView())
+    await channel.send(embed=embed, view=interview_panel_view())
     await interaction.response.send_message("✅ Panel sent.", ephemeral=True)
 
-class Dropdown(discord.ui.Select):
-    def __init__(self, question, options, session_key):
-        self.question = question
-        self.session_key = session_key
-        super().__init__(
-            placeholder="Select an option...",
-            options=[discord.SelectOption(label=opt) for opt in options],
-            min_values=1, max_values=1
-        )
-
-    async def callback(self, interaction: discord.Interaction):
-        interview_sessions[interaction.user.id][self.session_key] = self.values[0]
-        await interaction.message.delete()
-        await ask_next_question(interaction.user)
-
-class DropdownView(discord.ui.View):
-    def __init__(self, question, options, session_key):
-        super().__init__(timeout=60)
-        self.add_item(Dropdown(question, options, session_key))
+def dropdown_view(q_index, options):
+    return routed_view(discord.ui.Select(
+        placeholder="Select an option...",
+        options=[discord.SelectOption(label=opt) for opt in options],
+        min_values=1, max_values=1,
+        custom_id=custom_id("interview", "choice", q_index)
+    ))
 
 async def start_interview(user: discord.User):
     try:
-        interview_sessions[user.id] = {}
+        interview_engine.start(user.id)
         await user.send(embed=discord.Embed(
             title="📋 Interview Started",
             description="Please answer the following 12 questions. Respond carefully.",
             color=discord.Color.teal()
         ))
         await ask_next_question(user)
-    except Exception as e:
-        print("DM Error:", e)
+    except Exception:
+        log.exception("Interview DM error", extra={"user_id": user.id})
         try:
             await user.send("❌ Unable to start the interview due to an error or closed DMs.")
         except:
@@ -1103,37 +1627,52 @@ dropdown_questions = {
     11: ["I Agree"]
 }
 
+interview_engine = InterviewEngine(interview_sessions, len(questions), dropdown_questions)
+
 async def ask_next_question(user: discord.User):
-    answers = interview_sessions[user.id]
-    q_index = len(answers)
+    # Sends the applicant's current question; answers come back through on_message / Dropdown
+    if user.id not in interview_engine:
+        return
 
-    if q_index >= len(questions):
+    if interview_engine.is_complete(user.id):
         await submit_interview(user)
         return
 
+    q_index = interview_engine.current_index(user.id)
     question = questions[q_index]
+    embed = discord.Embed(title=f"Question {q_index+1}", description=question, color=discord.Color.dark_gold())
 
     if q_index in dropdown_questions:
-        view = DropdownView(question, dropdown_questions[q_index], f"q{q_index}")
-        embed = discord.Embed(title=f"Question {q_index+1}", description=question, color=discord.Color.dark_gold())
-        await user.send(embed=embed, view=view)
+        await user.send(embed=embed, view=dropdown_view(q_index, dropdown_questions[q_index]))
     else:
-        embed = discord.Embed(title=f"Question {q_index+1}", description=question, color=discord.Color.dark_gold())
         await user.send(embed=embed)
+    await scheduler.schedule(
+        "interview_timeout", user.id, time.time() + INTERVIEW_ANSWER_TIMEOUT,
+        {"user_id": user.id, "q_index": q_index}
+    )
 
-        def check(m):
-            return m.author == user and isinstance(m.channel, discord.DMChannel)
-
-        try:
-            msg = await bot.wait_for("message", check=check, timeout=300)
-            interview_sessions[user.id][f"q{q_index}"] = msg.content
-            await ask_next_question(user)
-        except asyncio.TimeoutError:
-            await user.send("⏰ Interview timed out. Please start again with `/panel`.")
-            interview_sessions.pop(user.id, None)
+async def handle_interview_answer(message: discord.Message):
+    result = interview_engine.on_text(message.author.id, message.content)
+    if result == ANSWERED:
+        await ask_next_question(message.author)
+    elif result == NEEDS_CHOICE:
+        await message.channel.send("➡️ Please answer this question using the dropdown above.")
+
+@scheduler.handler("interview_timeout")
+async def interview_timeout_job(user_id, q_index):
+    # Stale if the applicant answered (or the interview ended) since this was scheduled
+    if user_id not in interview_engine or interview_engine.current_index(user_id) != q_index:
+        return
+    interview_engine.finish(user_id)
+    try:
+        user = bot.get_user(user_id) or await bot.fetch_user(user_id)
+        await user.send("⏰ Interview timed out. Please start again with `/panel`.")
+    except Exception:
+        pass
 
 async def submit_interview(user: discord.User):
-    data = interview_sessions.pop(user.id)
+    data = interview_engine.finish(user.id)
+    scheduler.cancel("interview_timeout", user.id)
     embed = discord.Embed(
         title=f"📝 Interview Application — {user.name}",
         color=discord.Color.orange(),
@@ -1152,15 +1691,24 @@ async def submit_interview(user: discord.User):
     )
     review_channel = bot.get_channel(REVIEW_CHANNEL_ID)
     if review_channel:
-        sent = await review_channel.send(embed=embed)
-        await sent.edit(view=ReviewButtons(user.id, sent.id))
+        sent = await outbound.send(Priority.REVIEW, review_channel, embed=embed)
+        await outbound.run(Priority.REVIEW, ("message", sent.id), lambda: sent.edit(view=review_buttons(user.id, sent.id)))
+        await review_index.add(sent.id, review_channel.id, user.id, user.name, embed.to_dict())
 
     await user.send("✅ Your interview has been submitted! You will be contacted after review.")
 
+async def load_application(channel, message_id):
+    # Reads the application from the review index; ones submitted before the index existed are fetched
+    row = await review_index.get(message_id)
+    if row:
+        return channel.get_partial_message(message_id), discord.Embed.from_dict(row["embed"]), row
+    message = await channel.fetch_message(message_id)
+    return message, message.embeds[0], None
+
 def has_review_permission(user: discord.User | discord.Member) -> bool:
-    return isinstance(user, discord.Member) and REVIEWER_ROLE_ID in [role.id for role in user.roles]
+    return permission_index.has(user, Privilege.REVIEWER)
 
-class RejectionReasonModal(discord.ui.Modal, title="Reject Application with Reason"):
+class RejectionReasonModal(TimedModal, title="Reject Application with Reason"):
     reason = discord.ui.TextInput(
         label="Reason for rejection",
         placeholder="Explain why the application was rejected...",
@@ -1176,109 +1724,90 @@ class RejectionReasonModal(discord.ui.Modal, title="Reject Application with Reas
         self.reviewer = reviewer
 
     async def on_submit(self, interaction: discord.Interaction):
-        review_channel = interaction.guild.get_channel(REVIEW_CHANNEL_ID)
-        applicant = interaction.guild.get_member(self.applicant_id)
-
-        if not review_channel or not applicant:
-            return await interaction.response.send_message("❌ Review channel or applicant not found.", ephemeral=True)
-
-        try:
-            message = await review_channel.fetch_message(self.message_id)
-        except discord.NotFound:
-            return await interaction.response.send_message("❌ Original application message not found.", ephemeral=True)
+        # Same concurrent path as the plain Reject button, just with the reviewer's reason
+        async with Responder(interaction) as reply:
+            try:
+                failures = await update_application_status(
+                    interaction=interaction,
+                    status="rejected",
+                    message_id=self.message_id,
+                    applicant_id=self.applicant_id,
+                    reviewer=self.reviewer,
+                    reason=self.reason.value,
+                )
+            except ReviewNotApplied as e:
+                return await reply.send(f"⚠️ {e}")
+            await reply.send(review_summary("rejected", failures))
+
+
+def review_buttons(applicant_id: int, message_id: int):
+    return routed_view(
+        discord.ui.Button(label="✅ Accept", style=discord.ButtonStyle.green,
+                          custom_id=custom_id("review", "accept", applicant_id, message_id)),
+        discord.ui.Button(label="❌ Reject", style=discord.ButtonStyle.red,
+                          custom_id=custom_id("review", "reject", applicant_id, message_id)),
+        discord.ui.Button(label="⚠️ Reject with Reason", style=discord.ButtonStyle.blurple,
+                          custom_id=custom_id("review", "reason", applicant_id, message_id)),
+    )
 
-        # Update the embed color
-        embed = message.embeds[0]
-        updated_embed = embed.copy()
-        updated_embed.color = discord.Color.red()
-        await message.edit(embed=updated_embed, view=None)
+@component_router.route("review")
+async def on_review_component(interaction: discord.Interaction, action, applicant_id, message_id):
+    applicant_id, message_id = int(applicant_id), int(message_id)
+    if not has_review_permission(interaction.user):
+        return await interaction.response.send_message("🚫 You don't have permission to review.", ephemeral=True)
 
-        reason_text = self.reason.value
+    if action == "reason":
+        return await interaction.response.send_modal(RejectionReasonModal(applicant_id, message_id, interaction.user))
 
-        # Send rejection log message in review channel
-        await review_channel.send(
-            f"{applicant.mention}'s submission has been denied by {self.reviewer.mention} with reason:\n```{reason_text}```"
-        )
-
-        # Send DM
+    status = "accepted" if action == "accept" else "rejected"
+    async with Responder(interaction) as reply:
         try:
-            await applicant.send(embed=discord.Embed(
-                title="❌ Application Rejected",
-                description=f"Your application was reviewed and **rejected**.\n\n**Reason:**\n```{reason_text}```",
-                color=discord.Color.red()
-            ))
-        except discord.Forbidden:
-            await interaction.followup.send("⚠️ Could not DM the applicant.", ephemeral=True)
-
-        # Send formatted log to REJECTED_LOG_CHANNEL
-        rejection_log_channel = interaction.guild.get_channel(REJECTED_LOG_CHANNEL_ID)
-        if rejection_log_channel:
-            log_embed = discord.Embed(
-                description=(
-                    "# Your interview application got rejected\n"
-                    f"{applicant.mention}\n\n"
-                    f"```Reason : {reason_text}```\n\n"
-                    "**Please watch interview questions again**\n"
-                    f"<#{REVIEW_VIDEO_CHANNEL_ID}>\n\n"
-                    "**Next time try to answer all the questions correctly**"
-                ),
-                color=discord.Color.red()
+            failures = await update_application_status(
+                interaction=interaction,
+                status=status,
+                message_id=message_id,
+                applicant_id=applicant_id,
+                reviewer=interaction.user,
             )
-            await rejection_log_channel.send(embed=log_embed)
+        except ReviewNotApplied as e:
+            return await reply.send(f"⚠️ {e}")
+        await reply.send(review_summary(status, failures))
 
-        await interaction.response.send_message("❌ Application rejected and logged.", ephemeral=True)
 
+def review_summary(status, failures):
+    summary = "✅ Application accepted." if status == "accepted" else "❌ Application rejected."
+    if failures:
+        summary += "\n⚠️ Some steps failed:\n" + "\n".join(f"- {f}" for f in failures)
+    return summary[:2000]
 
-class ReviewButtons(discord.ui.View):
-    def __init__(self, applicant_id: int, message_id: int):
-        super().__init__(timeout=None)
-        self.applicant_id = applicant_id
-        self.message_id = message_id
 
-    @discord.ui.button(label="✅ Accept", style=discord.ButtonStyle.green)
-    async def accept(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_review_permission(interaction.user):
-            return await interaction.response.send_message("🚫 You don't have permission to review.", ephemeral=True)
-        await update_application_status(
-            interaction=interaction,
-            status="accepted",
-            message_id=self.message_id,
-            applicant_id=self.applicant_id,
-            reviewer=interaction.user,
-        )
-        await interaction.response.send_message("✅ Application accepted.", ephemeral=True)
-
-    @discord.ui.button(label="❌ Reject", style=discord.ButtonStyle.red)
-    async def reject(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_review_permission(interaction.user):
-            return await interaction.response.send_message("🚫 You don't have permission to review.", ephemeral=True)
-        await update_application_status(
-            interaction=interaction,
-            status="rejected",
-            message_id=self.message_id,
-            applicant_id=self.applicant_id,
-            reviewer=interaction.user,
-        )
-        await interaction.response.send_message("❌ Application rejected.", ephemeral=True)
+class ReviewNotApplied(Exception):
+    # Nothing was changed: the application was already reviewed or couldn't be loaded
+    pass
+
 
-    @discord.ui.button(label="⚠️ Reject with Reason", style=discord.ButtonStyle.blurple)
-    async def reject_reason(self, interaction: discord.Interaction, button: discord.ui.Button):
-        if not has_review_permission(interaction.user):
-            return await interaction.response.send_message("🚫 You don't have permission to review.", ephemeral=True)
-        await interaction.response.send_modal(RejectionReasonModal(self.applicant_id, self.message_id, interaction.user))
+def already_reviewed(row):
+    reviewer = f" by <@{row['reviewer_id']}>" if row["reviewer_id"] else ""
+    return ReviewNotApplied(f"Already {row['status']}{reviewer}.")
 
 
 async def update_application_status(interaction, status, message_id, applicant_id, reviewer, reason="No reason provided"):
+    # Returns a list of "step: error" strings for anything that failed; raises ReviewNotApplied if it did nothing
     guild = interaction.guild
     channel = interaction.channel
     applicant = guild.get_member(applicant_id)
+    applicant_mention = applicant.mention if applicant else f"<@{applicant_id}>"
 
     try:
-        message = await channel.fetch_message(message_id)
-    except:
-        return
+        message, embed, row = await load_application(channel, message_id)
+    except Exception as e:
+        raise ReviewNotApplied(f"Could not load the application: {e}")
 
-    embed = message.embeds[0]
+    if row and row["status"] != "pending":
+        raise already_reviewed(row)
+    # Claim it before any side effects, so two reviewers clicking at once can't both go ahead
+    if row and not await review_index.claim(message_id, status, reviewer.id, reason):
+        raise already_reviewed(await review_index.get(message_id))
 
     # Update embed color
     if status == "accepted":
@@ -1286,29 +1815,29 @@ async def update_application_status(interaction, status, message_id, applicant_i
     else:
         embed.color = discord.Color.red()
 
-    await message.edit(embed=embed, view=None)
+    # Everything below is independent, so it goes out concurrently (one request per route at a time, review priority)
+    jobs = [("update application embed", ("message", channel.id), lambda: message.edit(embed=embed, view=None))]
 
     # Roles
     accepted_role = guild.get_role(ACCEPTED_ROLE_ID)
     pending_role = guild.get_role(PENDING_ROLE_ID)
 
     if status == "accepted" and applicant:
-        try:
-            if accepted_role:
-                await applicant.add_roles(accepted_role, reason="Application accepted")
-            if pending_role and pending_role in applicant.roles:
-                await applicant.remove_roles(pending_role, reason="Interview accepted, removing pending role")
-        except Exception as e:
-            print(f"❌ Role update failed: {e}")
+        if accepted_role:
+            jobs.append(("add accepted role", ("member", applicant.id),
+                         lambda: applicant.add_roles(accepted_role, reason="Application accepted")))
+        if pending_role and pending_role in applicant.roles:
+            jobs.append(("remove pending role", ("member", applicant.id),
+                         lambda: applicant.remove_roles(pending_role, reason="Interview accepted, removing pending role")))
 
     # Send message in current channel
     action = "accepted" if status == "accepted" else "denied"
-    await channel.send(
-        f"{applicant.mention}'s submission has been {action} successfully by {reviewer.mention} with reason:\n```{reason}```"
-    )
+    jobs.append(("review channel notice", ("send", channel.id), lambda: channel.send(
+        f"{applicant_mention}'s submission has been {action} successfully by {reviewer.mention} with reason:\n```{reason}```"
+    )))
 
     # DM user
-    try:
+    if applicant:
         dm_embed = discord.Embed(
             title="📬 Application Result",
             description=f"Your application has been **{status}**.",
@@ -1316,41 +1845,123 @@ async def update_application_status(interaction, status, message_id, applicant_i
         )
         dm_embed.add_field(name="Reviewed By", value=reviewer.mention, inline=True)
         dm_embed.add_field(name="Reason", value=reason, inline=False)
-        await applicant.send(embed=dm_embed)
-    except:
-        pass
+        jobs.append(("applicant DM", ("dm", applicant.id), lambda: applicant.send(embed=dm_embed)))
 
     # Logging to accepted/rejected log channels
+    log_channel = None
     if status == "accepted":
         log_channel = guild.get_channel(ACCEPTED_LOG_CHANNEL_ID)
-        if log_channel:
-            accepted_embed = discord.Embed(
-                title="__INTERVIEW ACCEPTED__",
-                description=(
-                    "**You have successfully passed the interview.**\n\n"
-                    f"{applicant.mention}\n\n"
-                    "**Please register In-Game to whitelist your account.**"
-                ),
-                color=discord.Color.from_rgb(233, 217, 9)
-            )
-            embed.set_image(url="https://cdn.discordapp.com/attachments/1372059707694645360/1397886068702842930/interview_accepted.gif?ex=6884abda&is=68835a5a&hm=825d7e365d03ec470e5ce8f6c10d41272d7ccf2e25f957b82aee603daf7c7c98&")
-            await log_channel.send(embed=accepted_embed)
+        log_embed = discord.Embed(
+            title="__INTERVIEW ACCEPTED__",
+            description=(
+                "**You have successfully passed the interview.**\n\n"
+                f"{applicant_mention}\n\n"
+                "**Please register In-Game to whitelist your account.**"
+            ),
+            color=discord.Color.from_rgb(233, 217, 9)
+        )
+        log_embed.set_image(url="https://cdn.discordapp.com/attachments/1372059707694645360/1397886068702842930/interview_accepted.gif?ex=6884abda&is=68835a5a&hm=825d7e365d03ec470e5ce8f6c10d41272d7ccf2e25f957b82aee603daf7c7c98&")
 
     elif status == "rejected":
         log_channel = guild.get_channel(REJECTED_LOG_CHANNEL_ID)
-        if log_channel:
-            rejected_embed = discord.Embed(
-                description=(
-                    "# Your interview application got rejected\n"
-                    f"{applicant.mention}\n\n"
-                    f"```Reason : {reason}```\n\n"
-                    "**Please watch interview questions again**\n"
-                    f"<#{REVIEW_VIDEO_CHANNEL_ID}>\n\n"
-                    "**Next time try to answer all the questions correctly**"
-                ),
-                color=discord.Color.red()
-            )
-            await log_channel.send(embed=rejected_embed)
-# -------- Keep Alive & Run --------
-keep_alive()
-bot.run(TOKEN)
+        log_embed = discord.Embed(
+            description=(
+                "# Your interview application got rejected\n"
+                f"{applicant_mention}\n\n"
+                f"```Reason : {reason}```\n\n"
+                "**Please watch interview questions again**\n"
+                f"<#{REVIEW_VIDEO_CHANNEL_ID}>\n\n"
+                "**Next time try to answer all the questions correctly**"
+            ),
+            color=discord.Color.red()
+        )
+
+    if log_channel:
+        jobs.append(("result log", ("send", log_channel.id), lambda: log_channel.send(embed=log_embed)))
+
+    failures = await outbound.fan_out(Priority.REVIEW, jobs)
+    await review_index.set_status(message_id, status, reviewer.id, reason, embed.to_dict())
+    for label, error in failures:
+        log.error("Application %s: %s failed", message_id, label, exc_info=error)
+    return [f"{label}: {error}" for label, error in failures]
+# ------------ /queue (pending applications) ------------
+async def build_queue_page(guild_id, after_message_id=0):
+    rows, has_more = await review_index.pending_page(after_message_id, QUEUE_PAGE_SIZE)
+    total = await review_index.pending_count()
+
+    embed = discord.Embed(title=f"📋 Pending Applications ({total})", color=discord.Color.orange())
+    if not rows:
+        embed.description = "✅ Nothing waiting for review." if not after_message_id else "No more pending applications."
+    for row in rows:
+        jump_url = f"https://discord.com/channels/{guild_id}/{row['channel_id']}/{row['message_id']}"
+        embed.add_field(
+            name=row["applicant_name"],
+            value=f"<@{row['applicant_id']}> • submitted <t:{int(row['submitted_at'])}:R> • [open]({jump_url})",
+            inline=False
+        )
+
+    view = None
+    if has_more:
+        view = routed_view(discord.ui.Button(
+            label="Next ▶", style=discord.ButtonStyle.secondary,
+            custom_id=custom_id("queue", "next", rows[-1]["message_id"])
+        ))
+    return embed, view
+
+@bot.tree.command(name="queue", description="List interview applications waiting for review")
+@requires(Privilege.REVIEWER)
+async def queue(interaction: discord.Interaction):
+    embed, view = await build_queue_page(interaction.guild_id)
+    await interaction.response.send_message(embed=embed, view=view or discord.utils.MISSING, ephemeral=True)
+
+@component_router.route("queue")
+async def on_queue_component(interaction: discord.Interaction, action, after_message_id):
+    if not has_review_permission(interaction.user):
+        return await interaction.response.send_message("🚫 You don't have permission to review.", ephemeral=True)
+    embed, view = await build_queue_page(interaction.guild_id, int(after_message_id))
+    await interaction.response.edit_message(embed=embed, view=view)
+
+# -------- Metrics --------
+@metrics_registry.collector
+def collect_bot_metrics():
+    yield metrics.gauge("gateway_connected", "1 while the gateway session is ready", int(bot.is_ready() and not bot.is_closed()))
+    yield metrics.gauge("gateway_latency_seconds", "Heartbeat latency", bot.latency)
+    yield metrics.gauge("guilds", "Guilds the bot is in", len(bot.guilds))
+
+    yield metrics.counter("interaction_auto_defers_total", "Handlers that had to be auto-deferred", deadline_misses, "command")
+    yield metrics.counter("interaction_expired_total", "Interactions that expired before any response",
+                          expired_interactions, "command")
+
+    yield metrics.counter("moderation_events_total", "Media-channel moderation events", moderation_queue.stats, "event")
+    yield metrics.gauge("moderation_pending", "Deletes waiting for the next bulk flush", len(moderation_queue))
+    yield metrics.counter("spam_events_total", "Spam detector events", spam_guard.stats, "event")
+    yield metrics.gauge("spam_tracked_users", "Users with a spam history window", len(spam_guard))
+    yield metrics.counter("join_dm_events_total", "Welcome DM queue events", join_dm_queue.stats, "event")
+    yield metrics.gauge("join_dm_queue_depth", "Welcome DMs waiting to be sent", len(join_dm_queue))
+    yield metrics.counter("poll_edit_events_total", "Live poll edit events", poll_editor.stats, "event")
+    yield metrics.counter("whitelist_announce_events_total", "Whitelist announcement events",
+                          whitelist_announcer.stats, "event")
+    yield metrics.counter("proof_media_events_total", "Proof transcoding events", proof_media.stats, "event")
+
+    classes = {p.name.lower(): p for p in Priority}
+    yield metrics.counter("outbound_jobs_total", "Outbound requests started", {n: outbound.waited[p] for n, p in classes.items()}, "priority")
+    yield metrics.counter("outbound_wait_seconds_total", "Time outbound requests spent queued",
+                          {n: outbound.wait_total[p] for n, p in classes.items()}, "priority")
+    yield metrics.gauge("outbound_queue_depth", "Outbound requests waiting", {n: outbound.depth(p) for n, p in classes.items()}, "priority")
+
+    spans = {f"{kind}:{name}": h for (kind, name), h in perf.histograms.items()}
+    yield metrics.counter("handler_calls_total", "Commands, clicks and events handled", {k: h.count for k, h in spans.items()}, "handler")
+    yield metrics.counter("handler_seconds_total", "Time spent in handlers", {k: h.total / 1000 for k, h in spans.items()}, "handler")
+    yield metrics.counter("handler_errors_total", "Handlers that raised",
+                          {f"{kind}:{name}": n for (kind, name), n in perf.errors.items()}, "handler")
+    yield metrics.gauge("loop_lag_max_seconds", "Worst event loop lag seen", perf.loop_lag.max / 1000)
+    yield metrics.counter("loop_stalls_total", "Event loop stalls over the threshold", perf.stall_count)
+
+    yield metrics.gauge("scheduled_jobs", "Pending scheduler jobs", len(scheduler))
+    yield metrics.gauge("interviews_active", "Interviews in progress", len(interview_sessions))
+    yield metrics.gauge("permission_index_members", "Members holding a privileged role", len(permission_index))
+    yield metrics.gauge("phash_index_size", "Perceptual hashes indexed", len(phash_index))
+
+# -------- Run --------
+# The health/metrics server (keep_alive.py) starts in setup_hook on the bot's own loop
+bot.run(TOKEN, log_handler=None)  # discord.py's own logs go through logs.py too
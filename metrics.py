@@ -0,0 +1,75 @@
+import logging
+import math
+
+log = logging.getLogger(__name__)
+
+# Prometheus text exposition for the counters the bot already keeps. Each
+# collector returns metric families when /metrics is scraped, so nothing here
+# runs on the hot paths that bump the counters.
+
+
+class Family:
+    __slots__ = ("name", "kind", "help", "samples")
+
+    def __init__(self, name, kind, help_text, samples):
+        self.name = name
+        self.kind = kind  # "counter" or "gauge"
+        self.help = help_text
+        self.samples = samples  # [(labels dict, value)]
+
+
+def counter(name, help_text, values, label=None):
+    # values: a number, or a mapping (e.g. a stats Counter) exported with one label per key
+    if label is None:
+        return Family(name, "counter", help_text, [({}, values)])
+    return Family(name, "counter", help_text, [({label: key}, value) for key, value in values.items()])
+
+
+def gauge(name, help_text, values, label=None):
+    if label is None:
+        return Family(name, "gauge", help_text, [({}, values)])
+    return Family(name, "gauge", help_text, [({label: key}, value) for key, value in values.items()])
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value):
+    value = float(value)
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(value) if not value.is_integer() else str(int(value))
+
+
+class Registry:
+    def __init__(self, namespace="frp"):
+        self.namespace = namespace
+        self._collectors = []
+
+    def collector(self, fn):
+        # fn() -> iterable of Family; usable as a decorator
+        self._collectors.append(fn)
+        return fn
+
+    def render(self):
+        lines = []
+        for collect in self._collectors:
+            try:
+                families = list(collect())
+            except Exception:
+                log.exception("Metrics collector %s failed", collect.__name__)
+                continue
+            for family in families:
+                name = f"{self.namespace}_{family.name}"
+                lines.append(f"# HELP {name} {family.help}")
+                lines.append(f"# TYPE {name} {family.kind}")
+                for labels, value in family.samples:
+                    if labels:
+                        label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels.items())
+                        lines.append(f"{name}{{{label_text}}} {_number(value)}")
+                    else:
+                        lines.append(f"{name} {_number(value)}")
+        return "\n".join(lines) + "\n"
@@ -0,0 +1,141 @@
+import asyncio
+import datetime
+import logging
+import time
+from collections import Counter
+
+import discord
+
+from outbound import Priority
+
+log = logging.getLogger(__name__)
+
+# Media-channel enforcement off the on_message path. on_message only hands
+# the offending message over; deletes are buffered per channel for a short
+# window and flushed with one bulk delete, and everyone who offended in that
+# window gets a single combined warning. An author who keeps posting gets at
+# most one warning per cooldown.
+
+BULK_DELETE_LIMIT = 100
+BULK_DELETE_MAX_AGE = datetime.timedelta(days=14) - datetime.timedelta(minutes=5)  # Discord refuses older messages
+
+
+class ModerationQueue:
+    def __init__(self, outbound, make_warning, schedule_delete, warn_cooldown=10.0, flush_window=1.5, max_pending=10_000):
+        self.outbound = outbound  # OutboundScheduler; everything here goes out as Priority.MODERATION
+        self.make_warning = make_warning  # [members] -> discord.Embed
+        self.schedule_delete = schedule_delete  # async (warning message) -> None
+        self.warn_cooldown = warn_cooldown
+        self.flush_window = flush_window
+        self.max_pending = max_pending
+        # queued, deleted, delete_failed, bulk_calls, warnings_sent, warnings_coalesced, api_calls_saved, dropped
+        self.stats = Counter()
+        self._channels = {}  # channel id -> channel
+        self._deletes = {}  # channel id -> [message ids]
+        self._offenders = {}  # channel id -> {author id: member}
+        self._offences = Counter()  # channel id -> offending messages (one warning each without coalescing)
+        self._flushers = {}  # channel id -> pending flush task
+        self._warned = {}  # (channel id, author id) -> monotonic time of the last warning
+        self._pending = 0
+
+    def __len__(self):
+        return self._pending
+
+    def submit(self, message: discord.Message):
+        # Text post in a media-only channel: delete it and warn the author
+        if self._buffer(message.channel, message.id):
+            self.stats["queued"] += 1
+            self._offenders.setdefault(message.channel.id, {})[message.author.id] = message.author
+            self._offences[message.channel.id] += 1
+
+    def delete_later(self, channel, message_id):
+        # Plain delete that rides along with the channel's next bulk flush
+        self._buffer(channel, message_id)
+
+    def _buffer(self, channel, message_id):
+        if self._pending >= self.max_pending:
+            self.stats["dropped"] += 1
+            return False
+        self._pending += 1
+        self._channels[channel.id] = channel
+        ids = self._deletes.setdefault(channel.id, [])
+        ids.append(message_id)
+        if channel.id not in self._flushers:
+            self._flushers[channel.id] = asyncio.ensure_future(self._flush_later(channel.id))
+        return True
+
+    async def _flush_later(self, channel_id):
+        try:
+            await asyncio.sleep(self.flush_window)
+        finally:
+            self._flushers.pop(channel_id, None)
+        try:
+            await self._flush(channel_id)
+        except Exception:
+            log.exception("Moderation flush failed", extra={"channel_id": channel_id})
+
+    async def _flush(self, channel_id):
+        channel = self._channels.pop(channel_id)
+        ids = self._deletes.pop(channel_id, [])
+        offenders = self._offenders.pop(channel_id, {})
+        offences = self._offences.pop(channel_id, 0)
+        self._pending -= len(ids)
+
+        await self._delete(channel, ids)
+        await self._warn(channel, list(offenders.values()), offences)
+
+    async def _delete(self, channel, ids):
+        cutoff = discord.utils.utcnow() - BULK_DELETE_MAX_AGE
+        recent = [i for i in ids if discord.utils.snowflake_time(i) > cutoff]
+        old = [i for i in ids if discord.utils.snowflake_time(i) <= cutoff]
+
+        for start in range(0, len(recent), BULK_DELETE_LIMIT):
+            chunk = recent[start:start + BULK_DELETE_LIMIT]
+            if len(chunk) == 1:
+                old.extend(chunk)
+                continue
+            objects = [discord.Object(id=i) for i in chunk]
+            try:
+                await self.outbound.run(Priority.MODERATION, ("delete", channel.id),
+                                        lambda: channel.delete_messages(objects))
+            except (discord.HTTPException, discord.RateLimited):
+                old.extend(chunk)  # Fall back to one by one
+                continue
+            self.stats["bulk_calls"] += 1
+            self.stats["deleted"] += len(chunk)
+            self.stats["api_calls_saved"] += len(chunk) - 1
+
+        # Single messages and ones too old for bulk delete
+        for message_id in old:
+            try:
+                await self.outbound.run(Priority.MODERATION, ("delete", channel.id),
+                                        channel.get_partial_message(message_id).delete)
+                self.stats["deleted"] += 1
+            except discord.NotFound:
+                pass
+            except (discord.HTTPException, discord.RateLimited):
+                # Forbidden, a 5xx or still rate limited after retries: skip this one, keep going
+                self.stats["delete_failed"] += 1
+                log.exception("Failed to delete message", extra={"channel_id": channel.id, "message_id": message_id})
+
+    def _should_warn(self, key, now):
+        if len(self._warned) > 1000:
+            self._warned = {k: t for k, t in self._warned.items() if now - t < self.warn_cooldown}
+        if now - self._warned.get(key, float("-inf")) < self.warn_cooldown:
+            return False
+        self._warned[key] = now
+        return True
+
+    async def _warn(self, channel, offenders, offences):
+        now = time.monotonic()
+        members = [m for m in offenders if self._should_warn((channel.id, m.id), now)]
+        # Every offending message used to get its own warning; each one skipped is a send + a delete we didn't make
+        coalesced = offences - min(len(members), 1)
+        self.stats["warnings_coalesced"] += coalesced
+        self.stats["api_calls_saved"] += 2 * coalesced
+        if not members:
+            return
+
+        warning = await self.outbound.send(Priority.MODERATION, channel, embed=self.make_warning(members))
+        self.stats["warnings_sent"] += 1
+        await self.schedule_delete(warning)
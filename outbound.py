@@ -0,0 +1,197 @@
+import asyncio
+import enum
+import logging
+import time
+from collections import Counter, OrderedDict, deque
+
+import discord
+
+log = logging.getLogger(__name__)
+
+# Every outbound Discord request the bot makes on its own (logs, review
+# notices, announcements, DMs) goes through one scheduler. Work is picked by
+# priority class first; inside a class routes (a channel, a member's DMs) take
+# turns, so one busy channel can't starve the rest. At most `per_route` calls
+# run against a route at once and `concurrency` overall; discord.py still does
+# the actual rate-limit bucket waits.
+
+
+class Priority(enum.IntEnum):
+    MODERATION = 0
+    REVIEW = 1
+    ANNOUNCEMENT = 2
+    DM = 3
+
+
+class OutboundScheduler:
+    def __init__(self, concurrency=8, per_route=1, max_retries=2):
+        self.concurrency = concurrency
+        self.per_route = per_route
+        self.max_retries = max_retries
+        self._queues = [OrderedDict() for _ in Priority]  # per class: route -> deque of (enqueued, future, factory)
+        self._active = Counter()  # route -> calls in flight
+        self._running = 0
+        self._workers = set()  # Running _execute tasks; the loop only keeps weak references to tasks
+        self.waited = Counter()  # priority -> jobs started
+        self.wait_total = Counter()  # priority -> seconds spent queued
+        self.wait_max = Counter()
+
+    def depth(self, priority):
+        return sum(len(jobs) for jobs in self._queues[priority].values())
+
+    def latency(self):
+        # {class name: (jobs, mean queued ms, max queued ms)}
+        return {
+            p.name.lower(): (self.waited[p], self.wait_total[p] / self.waited[p] * 1000 if self.waited[p] else 0.0,
+                             self.wait_max[p] * 1000)
+            for p in Priority
+        }
+
+    async def run(self, priority, route, factory):
+        # factory() must return a fresh coroutine so a rate-limited call can be retried
+        future = asyncio.get_running_loop().create_future()
+        self._queues[priority].setdefault(route, deque()).append((time.monotonic(), future, factory))
+        self._pump()
+        return await future
+
+    async def send(self, priority, channel, *args, **kwargs):
+        # channel.send (or user.send for DMs) through the scheduler
+        return await self.run(priority, ("send", channel.id), lambda: channel.send(*args, **kwargs))
+
+    async def fan_out(self, priority, jobs):
+        # jobs: [(label, route, factory)] -> [(label, exception)] for the ones that failed
+        results = await asyncio.gather(
+            *(self.run(priority, route, factory) for _, route, factory in jobs),
+            return_exceptions=True
+        )
+        return [(label, result) for (label, _, _), result in zip(jobs, results) if isinstance(result, BaseException)]
+
+    def _next(self):
+        for priority, routes in enumerate(self._queues):
+            for route, jobs in routes.items():
+                if self._active[route] >= self.per_route:
+                    continue
+                job = jobs.popleft()
+                if jobs:
+                    routes.move_to_end(route)  # Next time the other routes go first
+                else:
+                    del routes[route]
+                return priority, route, job
+        return None
+
+    def _pump(self):
+        while self._running < self.concurrency:
+            picked = self._next()
+            if picked is None:
+                return
+            priority, route, job = picked
+            self._running += 1
+            self._active[route] += 1
+            task = asyncio.ensure_future(self._execute(priority, route, job))
+            self._workers.add(task)
+            task.add_done_callback(self._workers.discard)
+
+    async def _execute(self, priority, route, job):
+        enqueued, future, factory = job
+        waited = time.monotonic() - enqueued
+        self.waited[priority] += 1
+        self.wait_total[priority] += waited
+        self.wait_max[priority] = max(self.wait_max[priority], waited)
+        try:
+            if future.cancelled():
+                return
+            for attempt in range(self.max_retries + 1):
+                try:
+                    result = await factory()
+                    break
+                except discord.RateLimited as e:
+                    if attempt == self.max_retries:
+                        raise
+                    await asyncio.sleep(e.retry_after)
+            if not future.done():
+                future.set_result(result)
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self._running -= 1
+            self._active[route] -= 1
+            if not self._active[route]:
+                del self._active[route]
+            self._pump()
+
+
+class DebouncedEditor:
+    # Coalesces bursts of edits to the same message. The first edit goes out
+    # right away; anything scheduled during the following `interval` seconds
+    # collapses into one edit with the latest content.
+
+    def __init__(self, interval=3.0):
+        self.interval = interval
+        self.stats = Counter()  # scheduled, sent, coalesced
+        self._pending = {}  # key -> latest edit factory
+        self._tasks = {}
+
+    def schedule(self, key, factory):
+        self.stats["scheduled"] += 1
+        if key in self._pending:
+            self.stats["coalesced"] += 1
+        self._pending[key] = factory
+        if key not in self._tasks:
+            self._tasks[key] = asyncio.ensure_future(self._run(key))
+
+    async def stop(self):
+        # Drops edits that haven't gone out yet
+        self._pending.clear()
+        tasks = list(self._tasks.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _run(self, key):
+        try:
+            while key in self._pending:
+                factory = self._pending.pop(key)
+                try:
+                    await factory()
+                    self.stats["sent"] += 1
+                except Exception:
+                    log.exception("Debounced edit for %s failed", key)
+                await asyncio.sleep(self.interval)
+        finally:
+            self._tasks.pop(key, None)
+
+
+class BatchSender:
+    # Collects items for `window` seconds after the first one arrives and hands
+    # them to send() together, at most `max_batch` per call. A lone item goes
+    # out after one window; a burst goes out as a few combined messages.
+
+    def __init__(self, send, window=3.0, max_batch=10):
+        self.send = send  # async (items) -> None
+        self.window = window
+        self.max_batch = max_batch
+        self.stats = Counter()  # added, sent, combined
+        self._items = []
+        self._task = None
+
+    def add(self, item):
+        self.stats["added"] += 1
+        self._items.append(item)
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def _run(self):
+        try:
+            await asyncio.sleep(self.window)
+        finally:
+            self._task = None
+        items, self._items = self._items, []
+        for start in range(0, len(items), self.max_batch):
+            batch = items[start:start + self.max_batch]
+            try:
+                await self.send(batch)
+                self.stats["sent"] += 1
+                self.stats["combined"] += len(batch) - 1
+            except Exception:
+                log.exception("Batched send of %d item(s) failed", len(batch))
@@ -0,0 +1,186 @@
+import asyncio
+import bisect
+import time
+from collections import Counter, deque
+
+from discord import app_commands, ui
+from discord.ext import commands
+
+# Latency histograms for everything the bot runs in response to Discord:
+# prefix commands, slash commands, component clicks and on_* events, plus a
+# sampler that notices when something blocks the event loop. Spans are keyed
+# by (kind, name), e.g. ("slash", "wh") or ("event", "on_message").
+
+BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000)
+
+
+class Histogram:
+    __slots__ = ("counts", "count", "total", "max")
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKETS_MS) + 1)  # last bucket is +Inf
+        self.count = 0
+        self.total = 0.0  # ms
+        self.max = 0.0
+
+    def observe(self, ms):
+        self.counts[bisect.bisect_left(BUCKETS_MS, ms)] += 1
+        self.count += 1
+        self.total += ms
+        if ms > self.max:
+            self.max = ms
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+    def quantile(self, q):
+        # Upper bound of the bucket holding the q-th observation (capped at the max seen)
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, n in zip(BUCKETS_MS, self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bound, self.max)
+        return self.max
+
+
+class Perf:
+    def __init__(self):
+        self.histograms = {}  # (kind, name) -> Histogram
+        self.errors = Counter()  # (kind, name) -> failures
+        self.active = Counter()  # (kind, name) -> spans currently running
+        self.loop_lag = Histogram()
+        self.stalls = deque(maxlen=20)  # (wall time, lag ms, spans running at the time)
+        self.stall_count = 0
+        self.recent_slow = deque(maxlen=64)  # (perf_counter at finish, kind, name) for spans over 10 ms
+
+    def observe(self, kind, name, seconds, error=False):
+        key = (kind, name)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds * 1000)
+        if seconds >= 0.01:
+            self.recent_slow.append((time.perf_counter(), kind, name))
+        if error:
+            self.errors[key] += 1
+
+    def timed(self, kind, name):
+        return _Span(self, (kind, name))
+
+    def slowest(self, count=10, q=0.95):
+        # [(kind, name, histogram)] by the q-th percentile, worst first
+        ranked = sorted(self.histograms.items(), key=lambda item: item[1].quantile(q), reverse=True)
+        return [(kind, name, histogram) for (kind, name), histogram in ranked[:count]]
+
+    # Prefix commands: registered as the bot's before/after invoke hooks
+    async def before_invoke(self, ctx):
+        ctx.perf_started = time.perf_counter()
+
+    async def after_invoke(self, ctx):
+        started = getattr(ctx, "perf_started", None)
+        if started is not None:
+            self.observe("prefix", ctx.command.qualified_name, time.perf_counter() - started, ctx.command_failed)
+
+    # Slash commands: started by InstrumentedTree, finished on completion or in the tree's error handler
+    def finish_interaction(self, interaction, error=False):
+        started = interaction.extras.pop("perf_started", None)
+        if started is not None and interaction.command is not None:
+            self.observe("slash", interaction.command.qualified_name, time.perf_counter() - started, error)
+
+
+class _Span:
+    __slots__ = ("perf", "key", "started")
+
+    def __init__(self, perf, key):
+        self.perf = perf
+        self.key = key
+
+    async def __aenter__(self):
+        self.perf.active[self.key] += 1
+        self.started = time.perf_counter()
+
+    async def __aexit__(self, exc_type, exc, tb):
+        elapsed = time.perf_counter() - self.started
+        active = self.perf.active
+        active[self.key] -= 1
+        if not active[self.key]:
+            del active[self.key]
+        self.perf.observe(*self.key, elapsed, error=exc_type is not None and exc_type is not asyncio.CancelledError)
+
+
+class InstrumentedTree(app_commands.CommandTree):
+    async def interaction_check(self, interaction):
+        # Runs before every slash command's own checks
+        interaction.extras["perf_started"] = time.perf_counter()
+        return True
+
+
+class InstrumentedBot(commands.Bot):
+    def __init__(self, perf: Perf, *args, **kwargs):
+        super().__init__(*args, tree_cls=InstrumentedTree, **kwargs)
+        self.perf = perf
+        self.before_invoke(perf.before_invoke)
+        self.after_invoke(perf.after_invoke)
+
+    async def _run_event(self, coro, event_name, *args, **kwargs):
+        # Every on_* handler and listener is started through here
+        async def timed(*args, **kwargs):
+            async with self.perf.timed("event", event_name):
+                await coro(*args, **kwargs)
+        await super()._run_event(timed, event_name, *args, **kwargs)
+
+
+class TimedView(ui.View):
+    # discord.py runs View item callbacks from _scheduled_task, which bypasses both
+    # _run_event and the tree's interaction_check, so they're timed here
+    async def _scheduled_task(self, item, interaction, *args, **kwargs):
+        callback = getattr(item.callback, "callback", None)  # @ui.button / @ui.select methods
+        name = f"{type(self).__name__}.{getattr(callback, '__name__', type(item).__name__)}"
+        async with interaction.client.perf.timed("component", name):
+            await super()._scheduled_task(item, interaction, *args, **kwargs)
+
+
+class TimedModal(ui.Modal):
+    async def _scheduled_task(self, interaction, *args, **kwargs):
+        async with interaction.client.perf.timed("modal", type(self).__name__):
+            await super()._scheduled_task(interaction, *args, **kwargs)
+
+
+class LoopLagMonitor:
+    # Sleeps `interval` seconds at a time; waking up late means something held the
+    # loop. Lag over `threshold` is recorded as a stall along with the spans that
+    # were running or finished during it (the blocking one is among them).
+
+    def __init__(self, perf: Perf, interval=0.25, threshold=0.1):
+        self.perf = perf
+        self.interval = interval
+        self.threshold = threshold
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            started = time.perf_counter()
+            await asyncio.sleep(self.interval)
+            lag = time.perf_counter() - started - self.interval
+            self.perf.loop_lag.observe(lag * 1000)
+            if lag > self.threshold:
+                now = time.perf_counter()
+                suspects = {f"{kind}:{name}" for kind, name in self.perf.active}
+                suspects.update(f"{kind}:{name}" for ended, kind, name in self.perf.recent_slow if ended >= now - lag)
+                suspects = sorted(suspects)
+                self.perf.stalls.append((time.time(), lag * 1000, suspects))
+                self.perf.stall_count += 1
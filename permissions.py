@@ -0,0 +1,72 @@
+import enum
+
+import discord
+from discord import app_commands
+from discord.ext import commands
+
+# Privileged-role lookups. Each member's privileged roles are folded into one
+# bitmask, kept up to date from member events, so a permission check is a
+# dict lookup and an AND instead of a scan over member.roles.
+
+
+class Privilege(enum.IntFlag):
+    SAY = 1
+    ADMIN_LOG = 2
+    ALLOWED = 4
+    REVIEWER = 8
+
+
+class PermissionIndex:
+    def __init__(self, role_privileges: dict):
+        # role id -> Privilege bits; one role can grant several privileges
+        self.role_privileges = {}
+        for role_id, privilege in role_privileges.items():
+            self.role_privileges[role_id] = self.role_privileges.get(role_id, 0) | privilege
+        self._members = {}  # member id -> bitmask of privileges
+
+    def __len__(self):
+        return len(self._members)
+
+    def _compute(self, member):
+        # get_role is a binary search over the member's role ids; member.roles would build a sorted list
+        bits = 0
+        for role_id, privilege in self.role_privileges.items():
+            if member.get_role(role_id) is not None:
+                bits |= privilege
+        return bits
+
+    def update(self, member: discord.Member):
+        bits = self._compute(member)
+        if bits:
+            self._members[member.id] = bits
+        else:
+            self._members.pop(member.id, None)
+
+    def load(self, guild: discord.Guild):
+        self._members.clear()
+        for member in guild.members:
+            self.update(member)
+
+    def forget(self, member_id):
+        self._members.pop(member_id, None)
+
+    def has(self, user, privilege: Privilege) -> bool:
+        if not isinstance(user, discord.Member):
+            return False  # DMs
+        return bool(self._members.get(user.id, 0) & privilege)
+
+    def require(self, privilege: Privilege):
+        # One decorator for prefix and slash commands; failures raise CheckFailure for the error handlers
+        def ctx_check(ctx):
+            return self.has(ctx.author, privilege)
+
+        def interaction_check(interaction):
+            return self.has(interaction.user, privilege)
+
+        def decorator(func):
+            if isinstance(func, app_commands.Command):
+                return app_commands.check(interaction_check)(func)
+            if isinstance(func, commands.Command):
+                return commands.check(ctx_check)(func)
+            return app_commands.check(interaction_check)(commands.check(ctx_check)(func))
+        return decorator
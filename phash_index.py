@@ -0,0 +1,48 @@
+# Multi-index hashing over 64-bit perceptual hashes. The hash is split into
+# max_distance + 1 chunks; by the pigeonhole principle anything within
+# max_distance bits matches at least one chunk exactly, so a lookup only
+# checks the hashes sharing a chunk instead of the whole collection.
+
+
+class HammingIndex:
+    def __init__(self, bits=64, max_distance=8):
+        self.bits = bits
+        self.max_distance = max_distance
+        chunks = max_distance + 1
+        base, extra = divmod(bits, chunks)
+        self._spans = []
+        start = 0
+        for i in range(chunks):
+            width = base + (1 if i < extra else 0)
+            self._spans.append((start, (1 << width) - 1))
+            start += width
+        self._tables = [{} for _ in self._spans]
+        self._items = {}  # hash -> set of payloads
+
+    def __len__(self):
+        return sum(len(p) for p in self._items.values())
+
+    def add(self, h: int, payload):
+        payloads = self._items.get(h)
+        if payloads is None:
+            payloads = self._items[h] = set()
+            for table, (shift, mask) in zip(self._tables, self._spans):
+                table.setdefault((h >> shift) & mask, []).append(h)
+        payloads.add(payload)
+
+    def search(self, h: int, max_distance=None):
+        # [(distance, payload)] closest first, for everything within max_distance bits
+        if max_distance is None or max_distance > self.max_distance:
+            max_distance = self.max_distance
+        seen = set()
+        results = []
+        for table, (shift, mask) in zip(self._tables, self._spans):
+            for candidate in table.get((h >> shift) & mask, ()):
+                if candidate in seen:
+                    continue
+                seen.add(candidate)
+                distance = (h ^ candidate).bit_count()
+                if distance <= max_distance:
+                    results.extend((distance, p) for p in self._items[candidate])
+        results.sort(key=lambda r: r[0])
+        return results
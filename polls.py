@@ -0,0 +1,135 @@
+import json
+
+from db import Database
+
+# Polls and their votes live in SQLite so a poll survives restarts: buttons
+# are routed by custom_id and closing is a scheduler job at the stored deadline.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS polls (
+    id TEXT PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    message_id INTEGER,
+    author_id INTEGER NOT NULL,
+    question TEXT NOT NULL,
+    options TEXT NOT NULL,
+    multiple INTEGER NOT NULL,
+    deadline REAL,
+    closed INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS polls_open_deadline ON polls(closed, deadline);
+CREATE TABLE IF NOT EXISTS votes (
+    poll_id TEXT NOT NULL,
+    voter_id INTEGER NOT NULL,
+    option INTEGER NOT NULL,
+    PRIMARY KEY (poll_id, voter_id, option)
+) WITHOUT ROWID;
+"""
+
+# Vote outcomes
+VOTED = "voted"
+ALREADY_VOTED = "already_voted"
+ALREADY_VOTED_OPTION = "already_voted_option"
+CLOSED = "closed"
+
+MIGRATIONS = (
+    "ALTER TABLE polls ADD COLUMN live INTEGER NOT NULL DEFAULT 0",
+    "ALTER TABLE polls ADD COLUMN author_name TEXT NOT NULL DEFAULT ''",
+)
+
+
+def _poll(row):
+    if row is None:
+        return None
+    poll = dict(row)
+    poll["options"] = json.loads(poll["options"])
+    poll["multiple"] = bool(poll["multiple"])
+    poll["live"] = bool(poll["live"])
+    return poll
+
+
+class PollStore:
+    def __init__(self, path: str):
+        self.db = Database(path, SCHEMA, MIGRATIONS)
+        self._counts = {}  # poll id -> per-option vote counters, kept in step with every vote
+
+    async def create(self, poll_id, channel_id, author_id, author_name, question, options, multiple, deadline, live=False):
+        def _create(conn, row):
+            conn.execute(
+                "INSERT INTO polls (id, channel_id, author_id, author_name, question, options, multiple, deadline, live) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                row
+            )
+            conn.commit()
+        await self.db.run(_create, (poll_id, channel_id, author_id, author_name, question, json.dumps(options),
+                                    int(multiple), deadline, int(live)))
+        self._counts[poll_id] = [0] * len(options)
+
+    async def set_message(self, poll_id, message_id):
+        def _set(conn, poll_id, message_id):
+            conn.execute("UPDATE polls SET message_id = ? WHERE id = ?", (message_id, poll_id))
+            conn.commit()
+        await self.db.run(_set, poll_id, message_id)
+
+    async def get(self, poll_id):
+        def _get(conn, poll_id):
+            return _poll(conn.execute("SELECT * FROM polls WHERE id = ?", (poll_id,)).fetchone())
+        return await self.db.run(_get, poll_id)
+
+    async def vote(self, poll_id, voter_id, option):
+        def _vote(conn, poll_id, voter_id, option):
+            poll = conn.execute("SELECT multiple, closed FROM polls WHERE id = ?", (poll_id,)).fetchone()
+            if poll is None or poll["closed"]:
+                return CLOSED
+            with conn:
+                if poll["multiple"]:
+                    cur = conn.execute("INSERT OR IGNORE INTO votes VALUES (?, ?, ?)", (poll_id, voter_id, option))
+                    return VOTED if cur.rowcount else ALREADY_VOTED_OPTION
+                cur = conn.execute(
+                    "INSERT INTO votes SELECT ?, ?, ? WHERE NOT EXISTS "
+                    "(SELECT 1 FROM votes WHERE poll_id = ? AND voter_id = ?)",
+                    (poll_id, voter_id, option, poll_id, voter_id)
+                )
+                return VOTED if cur.rowcount else ALREADY_VOTED
+
+        counts = await self.counts(poll_id)
+        result = await self.db.run(_vote, poll_id, voter_id, option)
+        if result == VOTED and option < len(counts):
+            counts[option] += 1
+        return result
+
+    async def counts(self, poll_id):
+        # Per-option counts. Counted once from the votes table (e.g. after a restart), then incremental.
+        counts = self._counts.get(poll_id)
+        if counts is not None:
+            return counts
+
+        def _tally(conn, poll_id):
+            poll = conn.execute("SELECT options FROM polls WHERE id = ?", (poll_id,)).fetchone()
+            counts = [0] * (len(json.loads(poll["options"])) if poll else 0)
+            for option, count in conn.execute(
+                "SELECT option, COUNT(*) FROM votes WHERE poll_id = ? GROUP BY option", (poll_id,)
+            ):
+                if option < len(counts):
+                    counts[option] = count
+            return counts
+
+        counts = await self.db.run(_tally, poll_id)
+        return self._counts.setdefault(poll_id, counts)
+
+    async def close(self, poll_id):
+        # Returns False if someone else closed it first
+        def _close(conn, poll_id):
+            cur = conn.execute("UPDATE polls SET closed = 1 WHERE id = ? AND closed = 0", (poll_id,))
+            conn.commit()
+            return cur.rowcount == 1
+        return await self.db.run(_close, poll_id)
+
+    def forget(self, poll_id):
+        self._counts.pop(poll_id, None)
+
+    async def open_with_deadline(self):
+        def _open(conn):
+            rows = conn.execute("SELECT * FROM polls WHERE closed = 0 AND deadline IS NOT NULL").fetchall()
+            return [_poll(r) for r in rows]
+        return await self.db.run(_open)
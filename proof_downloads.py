@@ -0,0 +1,138 @@
+import asyncio
+import hashlib
+import io
+import tempfile
+
+import aiohttp
+import discord
+
+# Streams ticket attachments in parallel, spooling big ones to disk, so a
+# forward never holds every clip in RAM at once. Downloads start in a BytesIO
+# and move to a real temporary file past the spool threshold; both are plain
+# io objects, which discord.File accepts on every Python version
+# (SpooledTemporaryFile is only one from 3.11 on).
+
+CHUNK_SIZE = 64 * 1024
+
+
+class DownloadedProof:
+    def __init__(self, attachment: discord.Attachment, fp, size: int, digest: str):
+        self.attachment = attachment
+        self.fp = fp
+        self.size = size
+        self.digest = digest  # sha256 of the content, used by the proof store
+        self.upload = None  # (bytes, filename) replacing the original on upload, e.g. after transcoding
+
+    @property
+    def filename(self):
+        return self.attachment.filename
+
+    @property
+    def is_image(self):
+        return (self.attachment.content_type or "").startswith("image")
+
+    def read(self) -> bytes:
+        self.fp.seek(0)
+        return self.fp.read()
+
+    @property
+    def upload_size(self):
+        return len(self.upload[0]) if self.upload else self.size
+
+    def to_file(self) -> discord.File:
+        if self.upload:
+            data, filename = self.upload
+            return discord.File(io.BytesIO(data), filename=filename, spoiler=self.attachment.is_spoiler())
+        self.fp.seek(0)
+        return discord.File(self.fp, filename=self.attachment.filename, spoiler=self.attachment.is_spoiler())
+
+    def close(self):
+        try:
+            self.fp.close()
+        except Exception:
+            pass
+
+
+def fit_budget(items, budget, size):
+    # -> (items that fit, items that don't), keeping message order so one huge
+    # file can't starve the ones before it
+    kept, over = [], []
+    for item in items:
+        if size(item) > budget:
+            over.append(item)
+            continue
+        budget -= size(item)
+        kept.append(item)
+    return kept, over
+
+
+class SkippedProof:
+    def __init__(self, attachment: discord.Attachment, reason: str):
+        self.attachment = attachment
+        self.reason = reason
+
+
+class ProofDownloader:
+    def __init__(self, concurrency=4, spool_threshold=8 * 1024 * 1024, byte_budget=25 * 1024 * 1024):
+        self.concurrency = concurrency
+        self.spool_threshold = spool_threshold
+        self.byte_budget = byte_budget
+        self._session = None
+
+    async def _get_session(self):
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=120))
+        return self._session
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+    def _plan(self, attachments, byte_budget):
+        # Reserve the per-proof budget up front from the sizes Discord reports
+        planned, over = fit_budget(attachments, byte_budget, lambda a: a.size)
+        return planned, [SkippedProof(a, "over size budget") for a in over]
+
+    async def _download(self, session, semaphore, attachment):
+        async with semaphore:
+            fp = io.BytesIO()
+            sha = hashlib.sha256()
+            size = 0
+            try:
+                async with session.get(attachment.url) as resp:
+                    resp.raise_for_status()
+                    async for chunk in resp.content.iter_chunked(CHUNK_SIZE):
+                        size += len(chunk)
+                        # Never trust the stream past what the metadata promised.
+                        if size > attachment.size:
+                            raise ValueError("attachment larger than reported")
+                        if size > self.spool_threshold and isinstance(fp, io.BytesIO):
+                            spooled = tempfile.TemporaryFile()
+                            spooled.write(fp.getbuffer())
+                            fp.close()
+                            fp = spooled
+                        fp.write(chunk)
+                        sha.update(chunk)
+            except Exception:
+                fp.close()
+                raise
+            return DownloadedProof(attachment, fp, size, sha.hexdigest())
+
+    async def fetch_all(self, attachments, byte_budget=None):
+        # byte_budget overrides the default, e.g. with the target guild's upload limit
+        planned, skipped = self._plan(attachments, byte_budget or self.byte_budget)
+        session = await self._get_session()
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        results = await asyncio.gather(
+            *(self._download(session, semaphore, a) for a in planned),
+            return_exceptions=True
+        )
+
+        downloaded = []
+        for attachment, result in zip(planned, results):
+            if isinstance(result, BaseException):
+                skipped.append(SkippedProof(attachment, f"download failed: {result}"))
+            else:
+                downloaded.append(result)
+        return downloaded, skipped
@@ -0,0 +1,103 @@
+import asyncio
+import io
+import os
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+try:
+    from PIL import Image
+except ImportError:  # Pillow is optional; image features switch off without it
+    Image = None
+
+# CPU-heavy image work for proof forwarding. Everything here runs in a process
+# pool so decoding a big screenshot never stalls the gateway heartbeat.
+
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "2"))
+
+stats = Counter()  # transcoded, bytes_saved
+
+_pool = None
+
+
+def available():
+    return Image is not None
+
+
+def get_pool():
+    global _pool
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=MEDIA_WORKERS)
+    return _pool
+
+
+def shutdown():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _dhash(data: bytes, size=8) -> int:
+    # Difference hash: compare neighbouring pixels of a tiny greyscale copy.
+    # Survives re-compression and resizing, which is what re-posted proofs go through.
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("L", (size * 16, size * 16))
+        small = img.convert("L").resize((size + 1, size), Image.LANCZOS)
+        pixels = list(small.getdata())
+    h = 0
+    for row in range(size):
+        offset = row * (size + 1)
+        for col in range(size):
+            h = (h << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return h
+
+
+def _transcode(data: bytes, quality: int, max_dimension: int):
+    # Re-encode a still image as JPEG, downscaled to max_dimension on its long side
+    with Image.open(io.BytesIO(data)) as img:
+        if getattr(img, "is_animated", False):
+            return None
+        img.draft("RGB", (max_dimension, max_dimension))
+        img = img.convert("RGB")
+        img.thumbnail((max_dimension, max_dimension), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=quality, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def _thumbnail(data: bytes, size: int):
+    with Image.open(io.BytesIO(data)) as img:
+        img.draft("RGB", (size, size))
+        img = img.convert("RGB")
+        img.thumbnail((size, size), Image.LANCZOS)
+        out = io.BytesIO()
+        img.save(out, "JPEG", quality=75)
+    return out.getvalue()
+
+
+async def _run(fn, *args):
+    if not available():
+        return None
+    loop = asyncio.get_running_loop()
+    try:
+        return await loop.run_in_executor(get_pool(), fn, *args)
+    except Exception:
+        return None  # Not a decodable image
+
+
+async def transcode(data: bytes, quality=82, max_dimension=2560):
+    # Returns smaller JPEG bytes, or None when recompressing wouldn't help
+    result = await _run(_transcode, data, quality, max_dimension)
+    if result is None or len(result) >= len(data):
+        return None
+    stats["transcoded"] += 1
+    stats["bytes_saved"] += len(data) - len(result)
+    return result
+
+
+async def thumbnail(data: bytes, size=480):
+    return await _run(_thumbnail, data, size)
+
+
+async def perceptual_hash(data: bytes):
+    return await _run(_dhash, data)
@@ -0,0 +1,108 @@
+import os
+import shutil
+import time
+
+from db import Database
+
+# Content-addressed record of every forwarded proof. Blobs live on disk under
+# objects/<first two hex chars>/<sha256>; SQLite maps digests to the proof
+# channel message that first carried them.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS proofs (
+    digest TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    filename TEXT NOT NULL,
+    content_type TEXT,
+    proof_message_id INTEGER NOT NULL,
+    proof_jump_url TEXT NOT NULL,
+    ticket_channel_id INTEGER NOT NULL,
+    ticket_name TEXT NOT NULL,
+    forwarded_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attachments (
+    attachment_id INTEGER PRIMARY KEY,
+    digest TEXT NOT NULL REFERENCES proofs(digest)
+);
+CREATE TABLE IF NOT EXISTS phashes (
+    digest TEXT PRIMARY KEY REFERENCES proofs(digest),
+    phash TEXT NOT NULL
+);
+"""
+
+
+class ProofStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.db = Database(os.path.join(root, "proofs.db"), SCHEMA)
+
+    def _blob_path(self, digest):
+        return os.path.join(self.root, "objects", digest[:2], digest)
+
+    async def lookup_attachments(self, attachment_ids):
+        # attachment id -> proof row, for attachments we've already hashed
+        def _lookup(conn, ids):
+            if not ids:
+                return {}
+            marks = ",".join("?" * len(ids))
+            rows = conn.execute(
+                f"SELECT a.attachment_id, p.* FROM attachments a JOIN proofs p ON p.digest = a.digest "
+                f"WHERE a.attachment_id IN ({marks})",
+                ids
+            ).fetchall()
+            return {row["attachment_id"]: dict(row) for row in rows}
+        return await self.db.run(_lookup, list(attachment_ids))
+
+    async def lookup_digests(self, digests):
+        def _lookup(conn, digests):
+            if not digests:
+                return {}
+            marks = ",".join("?" * len(digests))
+            rows = conn.execute(f"SELECT * FROM proofs WHERE digest IN ({marks})", digests).fetchall()
+            return {row["digest"]: dict(row) for row in rows}
+        return await self.db.run(_lookup, list(digests))
+
+    async def record(self, proofs, message, ticket_channel):
+        # proofs: DownloadedProof objects that were uploaded in `message`
+        def _record(conn, entries):
+            now = time.time()
+            for digest, size, filename, content_type, attachment_id, fp in entries:
+                path = self._blob_path(digest)
+                if not os.path.exists(path):
+                    os.makedirs(os.path.dirname(path), exist_ok=True)
+                    fp.seek(0)
+                    with open(path + ".tmp", "wb") as out:
+                        shutil.copyfileobj(fp, out)
+                    os.replace(path + ".tmp", path)
+                conn.execute(
+                    "INSERT OR IGNORE INTO proofs VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                    (digest, size, filename, content_type, message.id, message.jump_url,
+                     ticket_channel.id, ticket_channel.name, now)
+                )
+                conn.execute("INSERT OR IGNORE INTO attachments VALUES (?, ?)", (attachment_id, digest))
+            conn.commit()
+
+        entries = [(p.digest, p.size, p.filename, p.attachment.content_type, p.attachment.id, p.fp) for p in proofs]
+        await self.db.run(_record, entries)
+
+    async def link_attachments(self, pairs):
+        # Remember (attachment_id, digest) for duplicates so they aren't downloaded again
+        def _link(conn, pairs):
+            conn.executemany("INSERT OR IGNORE INTO attachments VALUES (?, ?)", pairs)
+            conn.commit()
+        if pairs:
+            await self.db.run(_link, list(pairs))
+
+    async def record_phashes(self, pairs):
+        # (digest, 64-bit perceptual hash); stored as hex since SQLite integers are signed
+        def _record(conn, rows):
+            conn.executemany("INSERT OR REPLACE INTO phashes VALUES (?, ?)", rows)
+            conn.commit()
+        rows = [(digest, format(h, "016x")) for digest, h in pairs]
+        if rows:
+            await self.db.run(_record, rows)
+
+    async def load_phashes(self):
+        def _load(conn):
+            return [(row["digest"], int(row["phash"], 16)) for row in conn.execute("SELECT digest, phash FROM phashes")]
+        return await self.db.run(_load)
@@ -0,0 +1,73 @@
+import asyncio
+from collections import Counter
+
+import discord
+
+# One reply path for prefix commands and interactions. Interactions that are
+# still working once DEFER_AFTER seconds have passed get deferred so Discord's
+# 3 second deadline is never missed; the real answer then goes out as a followup.
+
+DEFER_AFTER = 2.0
+
+deadline_misses = Counter()  # command name -> times a handler had to be auto-deferred
+expired_interactions = Counter()  # command name -> times even the defer was too late
+
+
+class Responder:
+    def __init__(self, ctx, ephemeral=True, defer_after=DEFER_AFTER):
+        self.ctx = ctx
+        self.is_interaction = isinstance(ctx, discord.Interaction)
+        self.ephemeral = ephemeral
+        self._lock = asyncio.Lock()
+        self._timer = None
+        self._defer_task = None  # Kept so the task can't be garbage-collected mid-defer
+        if self.is_interaction and not ctx.response.is_done():
+            loop = asyncio.get_running_loop()
+            self._timer = loop.call_later(defer_after, self._start_defer)
+
+    @property
+    def author(self):
+        return self.ctx.user if self.is_interaction else self.ctx.author
+
+    @property
+    def command_name(self):
+        command = self.ctx.command
+        if command:
+            return command.qualified_name
+        # Component clicks have no command; name them by their custom_id prefix
+        return (self.ctx.data or {}).get("custom_id", "unknown").split(":")[0]
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self._cancel_timer()
+
+    def _cancel_timer(self):
+        if self._timer:
+            self._timer.cancel()
+            self._timer = None
+
+    def _start_defer(self):
+        self._defer_task = asyncio.ensure_future(self._auto_defer())
+
+    async def _auto_defer(self):
+        async with self._lock:
+            if self.ctx.response.is_done():
+                return
+            deadline_misses[self.command_name] += 1
+            try:
+                await self.ctx.response.defer(ephemeral=self.ephemeral, thinking=True)
+            except discord.NotFound:
+                expired_interactions[self.command_name] += 1
+
+    async def send(self, content=None, **kwargs):
+        if not self.is_interaction:
+            return await self.ctx.send(content, **kwargs)
+
+        kwargs.setdefault("ephemeral", self.ephemeral)
+        async with self._lock:
+            self._cancel_timer()
+            if self.ctx.response.is_done():
+                return await self.ctx.followup.send(content, **kwargs)
+            return await self.ctx.response.send_message(content, **kwargs)
@@ -0,0 +1,86 @@
+import json
+import time
+
+from db import Database
+
+# Local index of interview applications posted to the review channel, so the
+# review flow and /queue never have to scroll or refetch channel history.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS applications (
+    message_id INTEGER PRIMARY KEY,
+    channel_id INTEGER NOT NULL,
+    applicant_id INTEGER NOT NULL,
+    applicant_name TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    reviewer_id INTEGER,
+    reason TEXT,
+    submitted_at REAL NOT NULL,
+    reviewed_at REAL,
+    embed TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS applications_status ON applications(status, message_id);
+"""
+
+
+class ReviewIndex:
+    def __init__(self, path: str):
+        self.db = Database(path, SCHEMA)
+
+    async def add(self, message_id, channel_id, applicant_id, applicant_name, embed: dict):
+        def _add(conn, row):
+            conn.execute(
+                "INSERT OR REPLACE INTO applications "
+                "(message_id, channel_id, applicant_id, applicant_name, submitted_at, embed) VALUES (?, ?, ?, ?, ?, ?)",
+                row
+            )
+            conn.commit()
+        await self.db.run(_add, (message_id, channel_id, applicant_id, applicant_name, time.time(), json.dumps(embed)))
+
+    async def get(self, message_id):
+        def _get(conn, message_id):
+            row = conn.execute("SELECT * FROM applications WHERE message_id = ?", (message_id,)).fetchone()
+            if row is None:
+                return None
+            row = dict(row)
+            row["embed"] = json.loads(row["embed"])
+            return row
+        return await self.db.run(_get, message_id)
+
+    async def claim(self, message_id, status, reviewer_id, reason=None):
+        # Moves a pending application to `status`; returns False if another reviewer got there first
+        def _claim(conn, args):
+            cur = conn.execute(
+                "UPDATE applications SET status = ?, reviewer_id = ?, reason = ?, reviewed_at = ? "
+                "WHERE message_id = ? AND status = 'pending'",
+                args
+            )
+            conn.commit()
+            return cur.rowcount == 1
+        return await self.db.run(_claim, (status, reviewer_id, reason, time.time(), message_id))
+
+    async def set_status(self, message_id, status, reviewer_id, reason=None, embed: dict = None):
+        def _set(conn, args):
+            conn.execute(
+                "UPDATE applications SET status = ?, reviewer_id = ?, reason = ?, reviewed_at = ?, "
+                "embed = COALESCE(?, embed) WHERE message_id = ?",
+                args
+            )
+            conn.commit()
+        await self.db.run(_set, (status, reviewer_id, reason, time.time(), json.dumps(embed) if embed else None, message_id))
+
+    async def pending_page(self, after_message_id=0, limit=10):
+        # Keyset pagination: message ids are snowflakes, so they sort by submission time
+        def _page(conn, after, limit):
+            rows = conn.execute(
+                "SELECT message_id, channel_id, applicant_id, applicant_name, submitted_at FROM applications "
+                "WHERE status = 'pending' AND message_id > ? ORDER BY message_id LIMIT ?",
+                (after, limit + 1)
+            ).fetchall()
+            return [dict(r) for r in rows[:limit]], len(rows) > limit
+        return await self.db.run(_page, after_message_id, limit)
+
+    async def pending_count(self):
+        def _count(conn):
+            return conn.execute("SELECT COUNT(*) FROM applications WHERE status = 'pending'").fetchone()[0]
+        return await self.db.run(_count)
@@ -0,0 +1,182 @@
+import asyncio
+import datetime
+import heapq
+import json
+import logging
+import re
+import time
+
+from db import Database
+
+log = logging.getLogger(__name__)
+
+# One scheduler for every timed job in the bot (poll closes, interview
+# timeouts, reminders, delayed deletes). Jobs sit in a min-heap ordered by due
+# time and a single task sleeps until the earliest one. Jobs are persisted, so
+# anything that came due while the bot was down fires right after startup.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL,
+    key TEXT NOT NULL,
+    due REAL NOT NULL,
+    payload TEXT NOT NULL,
+    UNIQUE (kind, key)
+);
+"""
+
+
+class Scheduler:
+    def __init__(self, path: str):
+        self.db = Database(path, SCHEMA)
+        self.handlers = {}
+        self._heap = []  # (due, job id)
+        self._jobs = {}  # job id -> (kind, key, payload); heap entries not in here were cancelled
+        self._keys = {}  # (kind, key) -> job id
+        self._done = []  # fired/cancelled job ids waiting to be deleted from the database
+        self._wakeup = asyncio.Event()
+        self._task = None
+        self._firing = set()  # Handler tasks, referenced until they finish
+
+    def __len__(self):
+        return len(self._jobs)
+
+    def handler(self, kind):
+        def decorator(fn):
+            self.handlers[kind] = fn
+            return fn
+        return decorator
+
+    async def load(self):
+        def _load(conn):
+            return conn.execute("SELECT id, kind, key, due, payload FROM jobs").fetchall()
+
+        for row in await self.db.run(_load):
+            self._jobs[row["id"]] = (row["kind"], row["key"], json.loads(row["payload"]))
+            self._keys[(row["kind"], row["key"])] = row["id"]
+            self._heap.append((row["due"], row["id"]))
+        heapq.heapify(self._heap)
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.ensure_future(self._run())
+
+    async def stop(self, timeout=5.0):
+        # Shutdown: no new jobs fire; handlers already running get `timeout` seconds to finish
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+        if self._firing:
+            _, late = await asyncio.wait(self._firing, timeout=timeout)
+            for task in late:
+                task.cancel()
+            await asyncio.gather(*late, return_exceptions=True)
+        await self._forget_done()
+
+    async def schedule(self, kind, key, due: float, payload: dict):
+        # A job with the same (kind, key) replaces the pending one
+        key = str(key)
+
+        def _insert(conn, args):
+            cur = conn.execute("INSERT OR REPLACE INTO jobs (kind, key, due, payload) VALUES (?, ?, ?, ?)", args)
+            conn.commit()
+            return cur.lastrowid
+
+        job_id = await self.db.run(_insert, (kind, key, due, json.dumps(payload)))
+        old = self._keys.get((kind, key))
+        if old is not None:
+            self._jobs.pop(old, None)
+        self._jobs[job_id] = (kind, key, payload)
+        self._keys[(kind, key)] = job_id
+        if not self._heap or due < self._heap[0][0]:
+            self._wakeup.set()
+        heapq.heappush(self._heap, (due, job_id))
+        return job_id
+
+    def cancel(self, kind, key):
+        job_id = self._keys.pop((kind, str(key)), None)
+        if job_id is not None:
+            self._jobs.pop(job_id, None)
+            self._done.append(job_id)  # heap entry is skipped when it comes up
+            self._wakeup.set()  # so the row is deleted promptly
+
+    async def _forget_done(self):
+        if not self._done:
+            return
+        done, self._done = self._done, []
+
+        def _delete(conn, ids):
+            conn.executemany("DELETE FROM jobs WHERE id = ?", [(i,) for i in ids])
+            conn.commit()
+        await self.db.run(_delete, done)
+
+    async def _fire(self, kind, payload):
+        handler = self.handlers.get(kind)
+        if handler is None:
+            log.error("No handler for scheduled job kind %r", kind)
+            return
+        try:
+            await handler(**payload)
+        except Exception:
+            log.exception("Scheduled job %s failed", kind, extra={"payload": payload})
+
+    async def _run(self):
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                _, job_id = heapq.heappop(self._heap)
+                job = self._jobs.pop(job_id, None)
+                if job is None:
+                    continue  # Cancelled or replaced
+                kind, key, payload = job
+                if self._keys.get((kind, key)) == job_id:
+                    del self._keys[(kind, key)]
+                self._done.append(job_id)
+                task = asyncio.ensure_future(self._fire(kind, payload))
+                self._firing.add(task)
+                task.add_done_callback(self._firing.discard)
+
+            try:
+                await self._forget_done()
+            except Exception:
+                log.exception("Failed to clear finished jobs")
+
+            self._wakeup.clear()
+            timeout = self._heap[0][0] - time.time() if self._heap else None
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+
+# -------- Free-text deadlines (ban unban dates, FC cooldown ends) --------
+
+DURATION_PATTERN = re.compile(r"^\s*(\d+)\s*(m|min|mins|minutes?|h|hrs?|hours?|d|days?|w|weeks?|months?)\s*$", re.I)
+DATE_PATTERN = re.compile(r"^\s*(\d{1,4})[/.-](\d{1,2})[/.-](\d{1,4})\s*$")
+UNIT_SECONDS = {"m": 60, "h": 3600, "d": 86400, "w": 7 * 86400}
+
+
+def parse_deadline(text: str, now: float, tz: datetime.tzinfo):
+    # "3 days", "12h", "5/7/2025" (day first), "2025-07-05" -> epoch seconds; None for "Permanent", "No Unban", etc.
+    if not text:
+        return None
+
+    match = DURATION_PATTERN.match(text)
+    if match:
+        amount, unit = int(match.group(1)), match.group(2).lower()
+        seconds = 30 * 86400 if unit.startswith("mo") else UNIT_SECONDS[unit[0]]
+        return now + amount * seconds
+
+    match = DATE_PATTERN.match(text)
+    if match:
+        a, b, c = (int(g) for g in match.groups())
+        year, month, day = (a, b, c) if a > 31 else (c, b, a)
+        if year < 100:
+            year += 2000
+        try:
+            return datetime.datetime(year, month, day, tzinfo=tz).timestamp()
+        except ValueError:
+            return None
+    return None
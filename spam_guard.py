@@ -0,0 +1,74 @@
+from collections import Counter, OrderedDict
+
+# Flood and duplicate-content detection for on_message. Each user gets a small
+# ring buffer of (timestamp, content hash) for their last few messages, so a
+# check is a fixed handful of comparisons no matter how busy the server is.
+# Users who go quiet are evicted least-recently-seen first once max_users is hit.
+
+FLOOD = "flood"
+DUPLICATE = "duplicate"
+
+
+class _Track:
+    __slots__ = ("times", "hashes", "pos", "flagged_at")
+
+    def __init__(self, size):
+        self.times = [float("-inf")] * size
+        self.hashes = [0] * size
+        self.pos = 0
+        self.flagged_at = float("-inf")
+
+
+class SpamGuard:
+    def __init__(self, window=5.0, max_messages=6, max_duplicates=3, max_users=10_000):
+        self.window = window
+        self.max_messages = max_messages  # This many messages inside the window is a flood
+        self.max_duplicates = max_duplicates  # This many copies of the same text inside the window
+        self.max_users = max_users
+        self.size = max(max_messages, max_duplicates)
+        self.stats = Counter()  # checked, flood, duplicate, suppressed, evicted
+        self._users = OrderedDict()  # user id -> _Track, least recently seen first
+
+    def __len__(self):
+        return len(self._users)
+
+    def check(self, user_id, content, now):
+        # -> FLOOD, DUPLICATE or None. A flagged user isn't flagged again until a window has passed.
+        self.stats["checked"] += 1
+        users = self._users
+        track = users.get(user_id)
+        if track is None:
+            track = users[user_id] = _Track(self.size)
+            if len(users) > self.max_users:
+                users.popitem(last=False)
+                self.stats["evicted"] += 1
+        else:
+            users.move_to_end(user_id)
+
+        h = hash(content.strip().casefold()) if content else 0  # 0: attachment-only, never a duplicate
+        pos = track.pos
+        track.times[pos] = now
+        track.hashes[pos] = h
+        track.pos = (pos + 1) % self.size
+
+        cutoff = now - self.window
+        recent = duplicates = 0
+        for t, other in zip(track.times, track.hashes):
+            if t >= cutoff:
+                recent += 1
+                if h and other == h:
+                    duplicates += 1
+
+        if recent >= self.max_messages:
+            verdict = FLOOD
+        elif h and duplicates >= self.max_duplicates:
+            verdict = DUPLICATE
+        else:
+            return None
+
+        if now - track.flagged_at < self.window:
+            self.stats["suppressed"] += 1
+            return None
+        track.flagged_at = now
+        self.stats[verdict] += 1
+        return verdict